@@ -2,13 +2,56 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
+import json
+import contextlib
 import model
+import profiling
 from datetime import datetime
-import yfinance as yf
 import strategy_analysis_agent as agent
 
+# ----------------- Cache Parameters -----------------
+DATA_TTL = 3600  # Seconds before downloaded prices are refreshed
+MAX_CACHED_RUNS = 64  # Backtest results kept for recently used parameter sets
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def load_data(start_date):
+    """Download price data once per start date and share it across reruns and sessions"""
+    return model.download_data(start_date=start_date)
+
+
+@st.cache_data(ttl=DATA_TTL, max_entries=MAX_CACHED_RUNS, show_spinner=False)
+def run_strategy(start_date, config):
+    """
+    Run one full-history backtest and derive the rolling windows from it
+    
+    Args:
+        start_date: Start date string passed to load_data
+        config: StrategyConfig built from the sidebar sliders
+        
+    Returns:
+        Tuple of (rolling window results, portfolio, positions)
+    """
+    data = load_data(start_date)
+    signals = model.generate_signals(data, config=config)
+    portfolio, positions = model.backtest(data, signals, config=config)
+    results = model.rolling_backtest(data, config=config, single_pass=True, portfolio=portfolio)
+    return results, portfolio, positions
+
+def render_profile_report(collector):
+    """Show the stage timings and counters of a profiled run in the sidebar"""
+    report = collector.report()
+    st.sidebar.subheader("⏱️ Stage Timings")
+    if report['stages']:
+        st.sidebar.dataframe(collector.report_frame()[['calls', 'total_seconds', 'mean_seconds']]
+                             .style.format({'total_seconds': '{:.3f}', 'mean_seconds': '{:.3f}'}))
+    else:
+        st.sidebar.caption("No instrumented stage ran; every result came from the cache.")
+    for name, value in sorted(report['counters'].items()):
+        st.sidebar.caption(f"{name}: {value}")
+    st.sidebar.download_button("Download report (JSON)", json.dumps(report, indent=2),
+                               file_name="profile_report.json", mime="application/json")
+
 # Set page config
 st.set_page_config(
     page_title="ETF Rotation Strategy Dashboard",
@@ -129,6 +172,25 @@ vix_extreme = st.sidebar.slider(
     help="VIX level for exiting positions"
 )
 
+# Allocation Parameters
+st.sidebar.subheader("Allocation")
+top_k = st.sidebar.number_input(
+    "ETFs Held (Top K)",
+    min_value=1,
+    max_value=len(model.ETFS) - 1,
+    value=model.TOP_K,
+    step=1,
+    help="Number of strongest ETFs bought on each trade"
+)
+
+weighting = st.sidebar.selectbox(
+    "Weighting",
+    options=list(model.WEIGHTINGS),
+    index=list(model.WEIGHTINGS).index(model.WEIGHTING),
+    format_func=lambda option: {'equal': 'Equal', 'signal': 'Signal-proportional'}[option],
+    help="How the target exposure is split across the selected ETFs"
+)
+
 # Backtest Parameters
 st.sidebar.subheader("Backtest Settings")
 start_date = st.sidebar.date_input(
@@ -150,20 +212,37 @@ universe = {
 }
 st.sidebar.markdown("\n".join([f"- **{k}**: {v}" for k, v in universe.items()]))
 
+# Diagnostics
+st.sidebar.subheader("Diagnostics")
+profile_run = st.sidebar.checkbox(
+    "Profile this run",
+    value=profiling.ENABLED,
+    help="Time download, signals, backtests and LLM calls and show the report in the sidebar"
+)
+
 # Run backtest button
 if st.sidebar.button('🚀 Run Backtest'):
-    model.BASE_THRESHOLD = base_threshold
-    model.VOL_WINDOW = vol_window
-    model.TRAILING_STOP = trailing_stop
-    model.MAX_DRAWDOWN_STOP = max_drawdown_stop
-    model.VIX_HIGH_THRESHOLD = vix_high
-    model.VIX_EXTREME_THRESHOLD = vix_extreme
+    config = model.StrategyConfig(
+        base_threshold=base_threshold,
+        vol_window=vol_window,
+        trailing_stop=trailing_stop,
+        max_drawdown_stop=max_drawdown_stop,
+        vix_high_threshold=vix_high,
+        vix_extreme_threshold=vix_extreme,
+        top_k=top_k,
+        weighting=weighting
+    )
     
-    with st.spinner('📊 Downloading data and running backtest...'):
+    # Each run records into its own collector, so concurrent sessions never see each other's timings
+    profile_scope = profiling.collect() if profile_run else contextlib.nullcontext()
+    
+    with profile_scope as run_profile, st.spinner('📊 Downloading data and running backtest...'):
         try:
-            data = model.download_data(start_date=start_date.strftime('%Y-%m-%d'))
+            data = load_data(start_date.strftime('%Y-%m-%d'))
             
             if data is None or data.empty:
+                # Do not keep a failed download around for the whole TTL
+                load_data.clear()
                 st.error("❌ No data was downloaded. This could be due to API limits or connectivity issues.")
                 st.info("🔄 Please try again in a few minutes.")
             else:
@@ -172,18 +251,20 @@ if st.sidebar.button('🚀 Run Backtest'):
                 if len(data) < 252:
                     st.error("⚠️ Not enough data available. Please select an earlier start date.")
                 else:
-                    results = model.rolling_backtest(data)
+                    results, portfolio, positions = run_strategy(start_date.strftime('%Y-%m-%d'), config)
                     
                     if results.empty:
                         st.error("❌ No results generated. Please check the parameters and try again.")
                     else:
-                        # Strategy Analysis Section
+                        # Strategy Analysis Section: reserve one placeholder per window now and
+                        # fill them in after the charts are drawn, so LLM latency never delays them
                         st.subheader("📊 LLM Strategist Review")
-                        analyses = agent.analyze_all_windows(results, data)
-                        
-                        for analysis in analyses:
-                            with st.expander(f"**{analysis['period']}**"):
-                                st.markdown(analysis['analysis'])
+                        review_placeholders = []
+                        for _, row in results.iterrows():
+                            with st.expander(f"**{row['Start Date'].strftime('%Y-%m-%d')} to {row['End Date'].strftime('%Y-%m-%d')}**"):
+                                placeholder = st.empty()
+                                placeholder.markdown("⏳ Analysis pending...")
+                                review_placeholders.append(placeholder)
                         
                         # Create rolling window performance visualization
                         st.subheader("📈 Rolling Window Performance Analysis")
@@ -359,8 +440,6 @@ if st.sidebar.button('🚀 Run Backtest'):
                         
                         # Display current holdings
                         st.subheader("📊 Latest Portfolio Analysis")
-                        signals = model.generate_signals(data)
-                        portfolio, positions = model.backtest(data, signals)
                         
                         # Get active positions from the last row of positions
                         active_positions = positions.iloc[-1]
@@ -372,9 +451,18 @@ if st.sidebar.button('🚀 Run Backtest'):
                                 st.write(f"- {etf} ({universe[etf]}): {int(shares)} shares")
                         else:
                             st.write("Currently no active positions")
+                        
+                        # Stream the window analyses into their placeholders as they arrive
+                        with profiling.stage('llm_review'):
+                            for position, period, text, done in agent.iter_window_analyses(results, data):
+                                review_placeholders[position].markdown(text if done else text + " ▌")
                             
         except Exception as e:
             st.error(f"❌ Error during backtest: {str(e)}")
             st.info("🔄 Please check your parameters and try again.")
+    
+    if profile_run:
+        render_profile_report(run_profile)
+        profiling.emit_report(collector=run_profile)
 else:
     st.info("👈 Adjust the parameters in the sidebar and click '🚀 Run Backtest' to start the analysis")
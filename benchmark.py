@@ -0,0 +1,207 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import data_providers
+import metrics
+import model
+import optimize
+import synthetic_data
+
+# ----------------- Benchmark Parameters -----------------
+DEFAULT_OUTPUT = 'benchmark_results.json'  # Where results are written
+REPEAT = 3  # Timed runs per stage; the best run is compared
+REGRESSION_THRESHOLD = 0.20  # Relative slowdown of the best time reported as a regression
+DEFAULT_PARAMS = [0.1, 30, 10, 40, 140, 0.05, 0.20, 25, 50]  # Optimizer point at the model defaults
+TOP_K = 5  # Holdings of the top-K allocation stage
+
+
+def time_call(func, repeat=REPEAT):
+    """
+    Time a function, discarding its output and printed progress
+
+    Args:
+        func: Function without arguments
+        repeat: Number of timed runs
+
+    Returns:
+        Dictionary with the best and median wall time in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return {'best': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+def benchmark_scale(n_tickers, years, repeat=REPEAT, seed=0):
+    """
+    Time every pipeline stage on one synthetic panel
+
+    Args:
+        n_tickers: Number of price columns, SPY included
+        years: Years of daily data
+        repeat: Timed runs per stage
+        seed: Seed of the synthetic panel
+
+    Returns:
+        Dictionary with the panel shape and the timings of each stage
+    """
+    data = synthetic_data.make_price_panel(n_tickers, years, seed)
+    tickers = [column for column in data.columns if column != 'VIX']
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        signals = model.generate_signals(data)
+        portfolio, _ = model.backtest(data, signals)
+    values = portfolio['value']
+    returns = portfolio['return']
+    prices = data[tickers].to_numpy(dtype=float).T
+    price_returns = np.zeros_like(prices)
+    price_returns[:, 1:] = prices[:, 1:] / prices[:, :-1] - 1
+    bounds = model.window_bounds(len(data), 252, step_days=21)
+
+    stages = {}
+    with tempfile.TemporaryDirectory() as directory:
+        data_providers.FileProvider.save_frame(data, directory)
+        provider = data_providers.FileProvider(directory)
+        stages['download_data'] = time_call(
+            lambda: model.download_data(str(data.index[0]), store=None, provider=provider,
+                                        tickers=tickers), repeat)
+
+    stages['generate_signals'] = time_call(lambda: model.generate_signals(data), repeat)
+    stages['backtest'] = time_call(lambda: model.backtest(data, signals), repeat)
+    top_k = model.StrategyConfig(top_k=min(TOP_K, len(tickers) - 1), weighting='signal')
+    stages['backtest_top_k'] = time_call(lambda: model.backtest(data, signals, config=top_k), repeat)
+    stages['rolling_backtest'] = time_call(lambda: model.rolling_backtest(data), repeat)
+    stages['rolling_backtest_single_pass'] = time_call(
+        lambda: model.rolling_backtest(data, single_pass=True, step_days=21), repeat)
+    stages['series_metrics'] = time_call(lambda: (
+        model.calculate_annual_return(values),
+        model.calculate_annual_volatility(returns),
+        model.calculate_sharpe_ratio(returns),
+        model.calculate_max_drawdown(values),
+        model.calculate_average_turnover(values),
+    ), repeat)
+    stages['compute_metrics'] = time_call(lambda: metrics.compute_metrics(prices), repeat)
+    stages['window_metrics'] = time_call(
+        lambda: metrics.window_metrics(prices, price_returns, bounds), repeat)
+    stages['optimizer_iteration'] = time_call(lambda: optimize.objective(DEFAULT_PARAMS, data), repeat)
+
+    return {'n_tickers': n_tickers, 'years': years, 'n_days': len(data), 'stages': stages}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales=('small',), repeat=REPEAT, seed=0):
+    """
+    Run the benchmark suite
+
+    Args:
+        scales: Names from synthetic_data.SCALES
+        repeat: Timed runs per stage
+        seed: Seed of the synthetic panels
+
+    Returns:
+        Dictionary with run metadata and the results of each scale, ready to be saved as JSON
+    """
+    results = {}
+    for scale in scales:
+        n_tickers, years = synthetic_data.SCALES[scale]
+        print(f"Benchmarking {scale} ({n_tickers} tickers x {years} years)...")
+        results[scale] = benchmark_scale(n_tickers, years, repeat, seed)
+        for stage, timing in results[scale]['stages'].items():
+            print(f"  {stage:<30} {timing['best'] * 1000:10.1f} ms")
+
+    return {
+        'metadata': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two benchmark runs stage by stage
+
+    Args:
+        current: Output of run_benchmarks
+        baseline: Earlier output of run_benchmarks, e.g. from the parent commit
+        threshold: Relative slowdown of the best time that counts as a regression
+
+    Returns:
+        List of (scale, stage, baseline seconds, current seconds, ratio) for
+        every stage slower than baseline * (1 + threshold)
+    """
+    regressions = []
+    print(f"\n{'scale':<8} {'stage':<30} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for scale, result in current['results'].items():
+        baseline_stages = baseline['results'].get(scale, {}).get('stages', {})
+        for stage, timing in result['stages'].items():
+            if stage not in baseline_stages:
+                continue
+            before = baseline_stages[stage]['best']
+            after = timing['best']
+            ratio = after / before if before > 0 else float('inf')
+            flag = '  <-- regression' if ratio > 1 + threshold else ''
+            print(f"{scale:<8} {stage:<30} {before * 1000:12.1f} {after * 1000:12.1f} {ratio:7.2f}{flag}")
+            if flag:
+                regressions.append((scale, stage, before, after, ratio))
+    return regressions
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark the strategy pipeline on synthetic data")
+    parser.add_argument('--scales', nargs='+', default=['small'], choices=list(synthetic_data.SCALES),
+                        help="Panel sizes to run")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="Timed runs per stage")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic panels")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON file to write the results to")
+    parser.add_argument('--compare', help="Baseline JSON file to compare the results against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown reported as a regression")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmarks(args.scales, args.repeat, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import data_providers
+import model
+import strategy_analysis_agent
+import synthetic_data
+
+# ----------------- Fixture Parameters -----------------
+OFFLINE_START_DATE = '2000-01-01'  # Start date passed to download_data by the offline tests
+OFFLINE_YEARS = 10  # Length of the offline dataset; long enough for two 5-year windows
+OFFLINE_SEED = 2000  # Seed of the offline dataset
+
+
+@pytest.fixture(scope='session', autouse=True)
+def untouched_response_cache():
+    """Fail the session if a test writes into the real LLM response cache"""
+    directory = strategy_analysis_agent.RESPONSE_CACHE_DIR
+    before = set(os.listdir(directory)) if os.path.isdir(directory) else set()
+    yield
+    after = set(os.listdir(directory)) if os.path.isdir(directory) else set()
+    assert after <= before, f"Tests wrote {len(after - before)} file(s) into {directory}"
+
+
+@pytest.fixture(scope='session')
+def price_panel():
+    """Deterministic synthetic prices for SPY, the sector ETFs and VIX, shared by the whole session"""
+    return synthetic_data.make_price_panel(len(model.ETFS), OFFLINE_YEARS, seed=OFFLINE_SEED)
+
+
+@pytest.fixture(scope='session')
+def price_dir(price_panel, tmp_path_factory):
+    """Directory of per-ticker price files, laid out for data_providers.FileProvider"""
+    directory = tmp_path_factory.mktemp('prices')
+    data_providers.FileProvider.save_frame(price_panel, str(directory))
+    return str(directory)
+
+
+@pytest.fixture(scope='session')
+def offline_provider(price_dir):
+    """FileProvider that serves price_panel instead of Yahoo Finance"""
+    return data_providers.FileProvider(price_dir)
+
+
+@pytest.fixture(scope='session')
+def downloaded_data(offline_provider):
+    """Output of model.download_data run once against the offline provider"""
+    return model.download_data(OFFLINE_START_DATE, store=None, provider=offline_provider)
+
+
+@pytest.fixture(scope='class')
+def offline_model_data(request, offline_provider, downloaded_data):
+    """Attach the offline provider and downloaded data to a unittest.TestCase class"""
+    request.cls.provider = offline_provider
+    request.cls.downloaded = downloaded_data
@@ -0,0 +1,169 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# ----------------- Provider Parameters -----------------
+MAX_WORKERS = 8  # Maximum number of concurrent ticker downloads
+MAX_RETRIES = 3  # Attempts per ticker before giving up
+RETRY_BACKOFF = 1.0  # Initial wait between attempts in seconds, doubled after each retry
+
+
+def _slice(prices, start_date, end_date):
+    """Restrict a date-indexed Series to [start_date, end_date)"""
+    index = pd.to_datetime(pd.Index(prices.index))
+    mask = index >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= index < pd.Timestamp(end_date)
+    return prices[mask]
+
+
+class DataProvider:
+    """
+    Base class for close-price data sources used by ``model.download_data``.
+
+    Subclasses implement ``fetch`` for a single ticker. ``fetch_many`` loads a
+    batch of tickers, each from its own start date, and may be overridden to
+    fetch concurrently.
+    """
+
+    def fetch(self, symbol, start_date, end_date):
+        """
+        Fetch daily close prices for one ticker
+
+        Args:
+            symbol: Ticker symbol
+            start_date: First date to fetch (inclusive)
+            end_date: Last date to fetch (exclusive)
+
+        Returns:
+            Series of close prices indexed by datetime.date
+        """
+        raise NotImplementedError
+
+    def fetch_many(self, requests, end_date):
+        """
+        Fetch close prices for several tickers
+
+        Args:
+            requests: Dictionary mapping ticker symbol to its start date
+            end_date: Last date to fetch (exclusive)
+
+        Returns:
+            Dictionary mapping ticker symbol to a Series of close prices; a
+            ticker whose fetch failed is left out, so an empty Series always
+            means the source had no bars in the range
+        """
+        results = {symbol: self._fetch_or_none(symbol, start_date, end_date)
+                   for symbol, start_date in requests.items()}
+        return {symbol: prices for symbol, prices in results.items() if prices is not None}
+
+    def _fetch_or_none(self, symbol, start_date, end_date):
+        try:
+            return self.fetch(symbol, start_date, end_date)
+        except Exception as e:
+            print(f"Error downloading {symbol}: {str(e)}")
+            return None
+
+
+class YFinanceProvider(DataProvider):
+    """
+    Yahoo Finance provider that downloads tickers concurrently.
+
+    Each ticker is fetched on a bounded thread pool and retried with
+    exponential backoff on errors.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_retries=MAX_RETRIES, backoff=RETRY_BACKOFF):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def fetch(self, symbol, start_date, end_date):
+        import yfinance as yf
+
+        for attempt in range(self.max_retries):
+            try:
+                print(f"Downloading data for {symbol}...")
+                hist = yf.Ticker(symbol).history(start=start_date, end=end_date)['Close']
+                # Convert index to date only (remove time and timezone info)
+                hist.index = hist.index.date
+                hist.name = symbol
+                return hist
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                print(f"Retrying {symbol} in {delay:.1f}s after error: {str(e)}")
+                time.sleep(delay)
+
+    def fetch_many(self, requests, end_date):
+        if not requests:
+            return {}
+        workers = max(1, min(self.max_workers, len(requests)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {symbol: executor.submit(self._fetch_or_none, symbol, start_date, end_date)
+                       for symbol, start_date in requests.items()}
+            results = {symbol: future.result() for symbol, future in futures.items()}
+        return {symbol: prices for symbol, prices in results.items() if prices is not None}
+
+
+class FileProvider(DataProvider):
+    """
+    Provider that reads close prices from local CSV or Parquet files.
+
+    Each ticker lives in its own file named after the symbol without a leading
+    caret (``^VIX`` is read from ``VIX.csv`` or ``VIX.parquet``). Files hold a
+    date index and a ``Close`` column, as written by ``save_frame``.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, symbol):
+        name = symbol.lstrip('^')
+        for extension in ('.parquet', '.csv'):
+            path = os.path.join(self.directory, name + extension)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"No price file for {symbol} in {self.directory}")
+
+    def fetch(self, symbol, start_date, end_date):
+        path = self._path(symbol)
+        if path.endswith('.parquet'):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path, index_col=0)
+        prices = frame['Close'] if 'Close' in frame.columns else frame.iloc[:, 0]
+        prices.index = pd.to_datetime(prices.index).date
+        prices.name = symbol
+        return _slice(prices.astype(float), start_date, end_date)
+
+    @staticmethod
+    def save_frame(data, directory, file_format='csv'):
+        """
+        Write a price DataFrame (one column per ticker) as provider files
+
+        Args:
+            data: DataFrame indexed by date, e.g. the output of download_data
+            directory: Target directory
+            file_format: 'csv' or 'parquet'
+        """
+        os.makedirs(directory, exist_ok=True)
+        for column in data.columns:
+            frame = pd.DataFrame({'Close': data[column].values},
+                                 index=pd.Index(pd.to_datetime(data.index), name='Date'))
+            path = os.path.join(directory, f"{column.lstrip('^')}.{file_format}")
+            if file_format == 'parquet':
+                frame.to_parquet(path)
+            else:
+                frame.to_csv(path)
+
+
+def default_provider():
+    """Return a FileProvider when PRICE_DATA_DIR is set, otherwise a YFinanceProvider"""
+    directory = os.getenv('PRICE_DATA_DIR')
+    if directory:
+        return FileProvider(directory)
+    return YFinanceProvider()
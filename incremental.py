@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import tempfile
+from dataclasses import asdict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import model
+
+# ----------------- Incremental Parameters -----------------
+# Location of the persisted daily state; override with STRATEGY_STATE_PATH
+DEFAULT_STATE_PATH = os.getenv('STRATEGY_STATE_PATH', os.path.join('data', 'strategy_state.json'))
+STATE_VERSION = 2  # Bumped when the persisted layout changes
+
+
+class StrategyState:
+    """
+    Persisted state of the strategy for once-a-day incremental updates.
+
+    The state holds everything the full pipeline carries from one day to the
+    next: the running cumulative sums and valid-price counts behind MA energy
+    (centred on each column's first price, as in model.ma_energy_matrix), a
+    ring buffer of their last window values, the open holdings in the order
+    they were opened, entry prices and cash. update() consumes one new bar in
+    O(tickers) and performs exactly the floating-point operations of
+    generate_signals followed by backtest, so its output matches a full
+    replay of the history bit for bit. The prices of the last applied bar
+    are kept as well, so update_many() can tell when the provider has
+    re-adjusted the history since (after a dividend or split) and replay it.
+
+    Build the state once with from_history(), then save() it and load() it
+    on the next run.
+    """
+
+    def __init__(self, columns, config=None, tradable=None):
+        self.config = config or model.StrategyConfig.from_globals()
+        self.columns = list(columns)
+        self.etf_columns = [col for col in self.columns if col != 'VIX']
+        self.tradable = model.tradable_mask(self.columns, tradable)
+        self.tradable_index = np.flatnonzero(self.tradable)
+        self.position_index = [self.etf_columns.index(col) if col in self.etf_columns else -1
+                               for col in self.columns]
+        self.vix_index = self.columns.index('VIX')
+
+        n = len(self.tradable_index)
+        window = max(self.config.window, 1)
+        self.day = 0
+        self.last_date = None
+        self.last_prices = None
+        self.offset = np.zeros(n)
+        self.has_offset = np.zeros(n, dtype=bool)
+        self.csum = np.zeros(n)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.csum_ring = np.zeros((window, n))
+        self.count_ring = np.zeros((window, n), dtype=np.int64)
+
+        self.holdings = {}  # Column index -> shares, in the order positions were opened
+        self.entry_prices = {}  # Ticker -> price of the last trade
+        self.positions = [0] * len(self.etf_columns)
+        self.cash = self.config.initial_capital
+        self.value = self.config.initial_capital
+
+    @classmethod
+    def from_history(cls, data, config=None, tradable=None):
+        """
+        Build the state by replaying a price history
+
+        Args:
+            data: DataFrame with price data, as returned by model.download_data
+            config: StrategyConfig (defaults to the module-level parameters)
+            tradable: Tradable tickers (see model.tradable_mask)
+
+        Returns:
+            StrategyState positioned after the last row of data
+        """
+        state = cls(data.columns, config, tradable)
+        state.update_many(data)
+        return state
+
+    def _energy(self, prices):
+        """Advance the running sums by one bar and return the MA energy of the tradable columns"""
+        values = prices[self.tradable_index]
+        valid = np.isfinite(values)
+        first = valid & ~self.has_offset
+        self.offset[first] = values[first]
+        self.has_offset |= valid
+
+        self.csum = self.csum + np.where(valid, values - self.offset, 0.0)
+        self.count = self.count + valid
+
+        i = self.day
+        window = self.config.window
+        slot = i % len(self.csum_ring)
+        if window < 1 or i < window - 1:
+            energy = np.full(len(values), np.nan)
+        else:
+            if i == window - 1:
+                window_sum = self.csum.copy()
+                window_count = self.count.copy()
+            else:
+                # The slot still holds the sums of day i - window
+                window_sum = self.csum - self.csum_ring[slot]
+                window_count = self.count - self.count_ring[slot]
+            ma = window_sum / window + self.offset
+            with np.errstate(divide='ignore', invalid='ignore'):
+                energy = np.where(window_count == window, (values - ma) / ma, np.nan)
+
+        self.csum_ring[slot] = self.csum
+        self.count_ring[slot] = self.count
+        return energy
+
+    def update(self, day, prices):
+        """
+        Apply one new bar
+
+        Args:
+            day: Date of the bar; must be later than the last applied bar
+            prices: Close prices of every column (Series or dict keyed by
+                    column, or an array in column order), VIX included
+
+        Returns:
+            Dictionary with the bar's 'date', portfolio 'value' and 'return',
+            the 'positions' recorded for the day (as in the positions frame of
+            backtest), the 'target_weights' of the trade made at the close
+            (empty when there is no trade) and the 'signals' of the tradable ETFs
+        """
+        day = pd.Timestamp(day).date()
+        if self.last_date is not None and day <= self.last_date:
+            raise ValueError(f"Bar for {day} is not after the last applied bar {self.last_date}")
+        if isinstance(prices, (pd.Series, dict)):
+            prices = [prices[col] for col in self.columns]
+        prices = np.asarray(prices, dtype=float)
+
+        # Signal row and trade decision, as in generate_signals and _target_plan
+        signal_row = np.zeros(len(self.columns))
+        signal_row[self.tradable_index] = self._energy(prices)
+        columns, ranked = model.rank_candidates(signal_row[None, :], self.config.top_k)
+        vix = prices[self.vix_index]
+        selected = ranked > self.config.base_threshold
+        if vix > self.config.vix_extreme_threshold:
+            selected[:] = False
+        vol_adj = 0.5 if vix > self.config.vix_high_threshold else 1.0
+        weights = model.allocation_weights(ranked, selected, self.config.weighting) * vol_adj
+        trades = [(col, weight) for col, weight, chosen
+                  in zip(columns[0].tolist(), weights[0].tolist(), selected[0].tolist()) if chosen]
+
+        # Trade loop step, as in _simulate
+        previous_value = self.value
+        row = prices.tolist()
+        recorded = list(self.positions)
+        target_weights = {}
+        if self.day >= self.config.min_history:
+            total_value = self.cash
+            for col, shares in self.holdings.items():
+                total_value += shares * row[col]
+            self.value = total_value
+
+            if self.config.top_k > 1 and trades:
+                chosen = [col for col, _ in trades]
+                for col in [col for col in self.holdings if col not in chosen]:
+                    del self.holdings[col]
+                    if self.position_index[col] >= 0:
+                        self.positions[self.position_index[col]] = 0
+
+            for col, weight in trades:
+                current_price = row[col]
+                target_shares = int(total_value * weight / current_price)
+                self.holdings[col] = target_shares
+                self.entry_prices[self.columns[col]] = current_price
+                if self.position_index[col] >= 0:
+                    self.positions[self.position_index[col]] = target_shares
+                target_weights[self.columns[col]] = weight
+
+            self.cash = total_value - sum(shares * row[col] for col, shares in self.holdings.items())
+
+        if self.day >= max(self.config.min_history, 1):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                daily_return = float(np.float64(self.value) / np.float64(previous_value) - 1)
+        else:
+            daily_return = 0.0
+
+        self.day += 1
+        self.last_date = day
+        self.last_prices = row
+        return {
+            'date': day,
+            'value': self.value,
+            'return': daily_return,
+            'positions': dict(zip(self.etf_columns, recorded)),
+            'target_weights': target_weights,
+            'signals': dict(zip([self.columns[i] for i in self.tradable_index],
+                                signal_row[self.tradable_index].tolist())),
+        }
+
+    def update_many(self, data):
+        """
+        Apply every row of data dated after the last applied bar
+
+        When data includes the last applied bar and its prices differ from
+        the ones the state was built with, the history has been re-adjusted:
+        the state is rebuilt by replaying all of data, so it keeps matching
+        a full replay.
+
+        Args:
+            data: DataFrame with price data for the state's columns
+
+        Returns:
+            List of update() results, one per row dated after the last
+            applied bar
+        """
+        values = data[self.columns].to_numpy(dtype=float)
+        if self.last_date is not None and self.last_prices is not None:
+            days = [pd.Timestamp(day).date() for day in data.index]
+            if self.last_date in days and not np.array_equal(
+                    values[days.index(self.last_date)], self.last_prices, equal_nan=True):
+                print(f"Prices through {self.last_date} were re-adjusted, replaying the full history...")
+                last_date = self.last_date
+                tradable = [self.columns[i] for i in self.tradable_index]
+                rebuilt = type(self)(self.columns, self.config, tradable)
+                replayed = rebuilt.update_many(data)
+                self.__dict__.update(rebuilt.__dict__)
+                return [result for result in replayed if result['date'] > last_date]
+        results = []
+        for day, prices in zip(data.index, values):
+            if self.last_date is not None and pd.Timestamp(day).date() <= self.last_date:
+                continue
+            results.append(self.update(day, prices))
+        return results
+
+    def holdings_frame(self):
+        """Return the open positions after the last trade as a Series of shares per ticker"""
+        return pd.Series(self.positions, index=self.etf_columns, dtype=np.int64)
+
+    def to_dict(self):
+        """Return the state as JSON-serializable data; floats round-trip exactly"""
+        config = asdict(self.config)
+        config['ma_windows'] = list(config['ma_windows'])
+        return {
+            'version': STATE_VERSION,
+            'config': config,
+            'columns': self.columns,
+            'tradable': [self.columns[i] for i in self.tradable_index],
+            'day': self.day,
+            'last_date': self.last_date.isoformat() if self.last_date else None,
+            'last_prices': self.last_prices,
+            'offset': self.offset.tolist(),
+            'has_offset': self.has_offset.tolist(),
+            'csum': self.csum.tolist(),
+            'count': self.count.tolist(),
+            'csum_ring': self.csum_ring.tolist(),
+            'count_ring': self.count_ring.tolist(),
+            'holdings': [[self.columns[col], shares] for col, shares in self.holdings.items()],
+            'entry_prices': self.entry_prices,
+            'positions': self.positions,
+            'cash': self.cash,
+            'value': self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        """Rebuild a state from to_dict() output"""
+        if payload.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported strategy state version: {payload.get('version')}")
+        state = cls(payload['columns'], model.StrategyConfig(**payload['config']), payload['tradable'])
+        state.day = payload['day']
+        state.last_date = date.fromisoformat(payload['last_date']) if payload['last_date'] else None
+        state.last_prices = payload['last_prices']
+        state.offset = np.array(payload['offset'], dtype=float)
+        state.has_offset = np.array(payload['has_offset'], dtype=bool)
+        state.csum = np.array(payload['csum'], dtype=float)
+        state.count = np.array(payload['count'], dtype=np.int64)
+        state.csum_ring = np.array(payload['csum_ring'], dtype=float).reshape(state.csum_ring.shape)
+        state.count_ring = np.array(payload['count_ring'], dtype=np.int64).reshape(state.count_ring.shape)
+        state.holdings = {state.columns.index(ticker): shares for ticker, shares in payload['holdings']}
+        state.entry_prices = dict(payload['entry_prices'])
+        state.positions = list(payload['positions'])
+        state.cash = payload['cash']
+        state.value = payload['value']
+        return state
+
+    def save(self, path=DEFAULT_STATE_PATH):
+        """Write the state as JSON, atomically"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE_PATH):
+        """Read a state written by save()"""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Apply new daily bars to the persisted strategy state")
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help="Strategy state file")
+    parser.add_argument('--start-date', default=model.START_DATE,
+                        help="Start date of the history used to build a new state")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    data = model.download_data(start_date=args.start_date)
+    if data is None:
+        raise SystemExit("No data available")
+
+    if os.path.exists(args.state):
+        state = StrategyState.load(args.state)
+        print(f"Loaded state through {state.last_date}")
+        updates = state.update_many(data)
+    else:
+        print("Building state from the full history...")
+        state = StrategyState.from_history(data)
+        updates = []
+    state.save(args.state)
+
+    for result in updates:
+        print(f"{result['date']}: value {result['value']:.2f}, target weights {result['target_weights']}")
+    print("\nCurrent holdings:")
+    print(state.holdings_frame().to_string())
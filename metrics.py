@@ -0,0 +1,181 @@
+import numpy as np
+
+# ----------------- Metric Parameters -----------------
+TRADING_DAYS = 252  # Trading days per year
+RISK_FREE_RATE = 0.02  # Annual risk-free rate used by Sharpe and Sortino ratios
+
+METRIC_NAMES = (
+    'annual_return', 'annual_volatility', 'sharpe', 'sortino', 'max_drawdown',
+    'calmar', 'turnover', 'hit_rate',
+)
+
+
+def _derive(n, total_return, mean, std, downside, max_drawdown, turnover, hits, active,
+            risk_free_rate):
+    """Turn per-row summary statistics into the annualized metric arrays"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annual_return = np.where(n < 2, 0.0, (1 + total_return) ** (1 / (n / TRADING_DAYS)) - 1)
+        annual_vol = std * np.sqrt(TRADING_DAYS)
+        annual_downside = downside * np.sqrt(TRADING_DAYS)
+        excess = mean * TRADING_DAYS - risk_free_rate
+        return {
+            'annual_return': annual_return,
+            'annual_volatility': annual_vol,
+            'sharpe': np.where(annual_vol == 0, 0.0, excess / annual_vol),
+            'sortino': np.where(annual_downside == 0, 0.0, excess / annual_downside),
+            'max_drawdown': max_drawdown,
+            'calmar': np.where(max_drawdown == 0, 0.0, annual_return / max_drawdown),
+            'turnover': turnover * TRADING_DAYS,
+            'hit_rate': np.where(active == 0, np.nan, hits / active),
+        }
+
+
+def _compute_block(values, returns, risk_free_rate):
+    """compute_metrics for a rectangular block of paths"""
+    n_rows, n_days = values.shape
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if returns is None:
+            returns = np.zeros_like(values)
+            returns[:, 1:] = values[:, 1:] / values[:, :-1] - 1
+        daily_change = np.abs(values[:, 1:] / values[:, :-1] - 1)
+
+        running_max = np.maximum.accumulate(values, axis=1)
+        max_drawdown = np.abs(((values - running_max) / running_max).min(axis=1))
+
+    std = returns.std(axis=1, ddof=1) if n_days > 1 else np.full(n_rows, np.nan)
+    turnover = daily_change.mean(axis=1) if n_days > 1 else np.full(n_rows, np.nan)
+    return _derive(
+        np.full(n_rows, n_days),
+        values[:, -1] / values[:, 0] - 1,
+        returns.mean(axis=1),
+        std,
+        np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2, axis=1)),
+        max_drawdown,
+        turnover,
+        (returns > 0).sum(axis=1),
+        (returns != 0).sum(axis=1),
+        risk_free_rate,
+    )
+
+
+def compute_metrics(values, returns=None, risk_free_rate=RISK_FREE_RATE):
+    """
+    Calculate every performance metric for many value paths in one NumPy pass
+
+    The definitions match the single-series functions in model
+    (calculate_annual_return, calculate_sharpe_ratio, ...): volatility uses the
+    sample standard deviation, drawdowns the running maximum and turnover the
+    mean absolute daily change of the values. Sortino uses the downside
+    deviation of the daily returns, Calmar divides the annual return by the
+    maximum drawdown and the hit rate is the share of positive days among days
+    with a non-zero return.
+
+    Args:
+        values: 2-D array of value paths (rows x days), or a list of 1-D paths
+                that may differ in length
+        returns: Daily returns with the same shape as values; by default the
+                 percentage change of values with zero on the first day
+        risk_free_rate: Annual risk-free rate
+
+    Returns:
+        Dictionary mapping each name in METRIC_NAMES to an array with one
+        entry per row
+    """
+    if isinstance(values, np.ndarray) and values.ndim == 2:
+        return _compute_block(values.astype(float, copy=False),
+                              None if returns is None else np.asarray(returns, dtype=float),
+                              risk_free_rate)
+
+    # Ragged input: evaluate rows of equal length together
+    paths = [np.asarray(path, dtype=float) for path in values]
+    return_paths = None if returns is None else [np.asarray(r, dtype=float) for r in returns]
+    results = {name: np.empty(len(paths)) for name in METRIC_NAMES}
+    rows_by_length = {}
+    for i, path in enumerate(paths):
+        rows_by_length.setdefault(len(path), []).append(i)
+
+    for rows in rows_by_length.values():
+        block_returns = None if return_paths is None else np.vstack([return_paths[i] for i in rows])
+        block = _compute_block(np.vstack([paths[i] for i in rows]), block_returns, risk_free_rate)
+        for name in METRIC_NAMES:
+            results[name][rows] = block[name]
+    return results
+
+
+def _prefix_sums(values):
+    """Return cumulative sums along the last axis with a leading zero, so sum(values[a:b]) = out[b] - out[a]"""
+    out = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, out=out[..., 1:])
+    return out
+
+
+def _window_max_drawdowns(values, bounds):
+    """
+    Maximum drawdown of values[..., a:b] for every window (a, b)
+
+    Windows sharing a start date share one running-maximum pass, so expanding
+    windows cost O(days) in total and rolling windows O(window) each.
+    """
+    drawdowns = np.empty(values.shape[:-1] + (len(bounds),))
+    by_start = {}
+    for i, (start_idx, end_idx) in enumerate(bounds):
+        by_start.setdefault(start_idx, []).append((i, end_idx))
+
+    for start_idx, windows in by_start.items():
+        path = values[..., start_idx:max(end_idx for _, end_idx in windows)]
+        rolling_max = np.maximum.accumulate(path, axis=-1)
+        worst = np.minimum.accumulate((path - rolling_max) / rolling_max, axis=-1)
+        for i, end_idx in windows:
+            drawdowns[..., i] = np.abs(worst[..., end_idx - start_idx - 1])
+    return drawdowns
+
+
+def window_metrics(values, returns, bounds, risk_free_rate=RISK_FREE_RATE):
+    """
+    Calculate every performance metric for windows of one or more paths
+
+    The returns of a window are returns[a + 1:b] preceded by a zero for its
+    first day, matching a backtest that starts flat on day a. Everything except
+    the drawdown comes from prefix sums over the full path, so each extra
+    window costs O(1). Several paths can be evaluated at once by passing
+    2-D values and returns (paths x days).
+
+    Args:
+        values: Array of portfolio values (or prices), 1-D or paths x days
+        returns: Daily returns of values, same shape as values
+        bounds: List of (start, end) index pairs, end exclusive
+        risk_free_rate: Annual risk-free rate
+
+    Returns:
+        Dictionary mapping each name in METRIC_NAMES to an array aligned with
+        bounds (paths x windows for 2-D input)
+    """
+    values = np.asarray(values, dtype=float)
+    returns = np.asarray(returns, dtype=float)
+    starts = np.array([start_idx for start_idx, _ in bounds], dtype=int)
+    ends = np.array([end_idx for _, end_idx in bounds], dtype=int)
+    n = ends - starts
+
+    def window_sum(series):
+        prefix = _prefix_sums(series)
+        return prefix[..., ends] - prefix[..., starts + 1]
+
+    total = window_sum(returns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        variance = np.maximum(window_sum(returns ** 2) - total * mean, 0.0) / (n - 1)
+        downside = np.sqrt(window_sum(np.minimum(returns, 0.0) ** 2) / n)
+        turnover = window_sum(np.abs(returns)) / (n - 1)
+
+    return _derive(
+        n,
+        values[..., ends - 1] / values[..., starts] - 1,
+        mean,
+        np.sqrt(variance),
+        downside,
+        _window_max_drawdowns(values, bounds),
+        turnover,
+        window_sum((returns > 0).astype(float)),
+        window_sum((returns != 0).astype(float)),
+        risk_free_rate,
+    )
@@ -1,9 +1,16 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime
 import time
+import os
+from dataclasses import dataclass, replace
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import data_providers
+import metrics
+import price_panel
+import price_store
+import profiling
 
 # ----------------- Strategy Parameters -----------------
 START_DATE = '2000-01-01'  # Backtest start date
@@ -22,62 +29,190 @@ MAX_DRAWDOWN_STOP = 0.20  # Maximum drawdown stop loss percentage
 VIX_HIGH_THRESHOLD = 25  # VIX high threshold
 VIX_EXTREME_THRESHOLD = 50  # VIX extreme threshold
 
-def download_data(start_date):
+# ----------------- Allocation Parameters -----------------
+TOP_K = 1  # Number of strongest ETFs bought on each trade (above 1, the others are sold)
+WEIGHTING = 'equal'  # Split of the target exposure across them: 'equal' or 'signal' (proportional)
+WEIGHTINGS = ('equal', 'signal')
+
+# ----------------- Data Parameters -----------------
+ETFS = ['SPY', 'XLK', 'XLV', 'XLE', 'XLF', 'XLI', 'XLY']  # Tradable universe (SPY is the benchmark)
+NON_TRADABLE = ('SPY', 'VIX')  # Columns that never receive a signal
+PRICE_STORE = price_store.DEFAULT_STORE_PATH  # Local price store (None to always download)
+OFFLINE = os.getenv('PRICE_STORE_OFFLINE', '') == '1'  # Serve data from the local store only
+
+@dataclass(frozen=True)
+class StrategyConfig:
+    """
+    Immutable, hashable set of strategy parameters
+    
+    Pass a config to generate_signals, get_target_weights, backtest and
+    rolling_backtest instead of assigning to the module-level parameters, so
+    runs with different parameters can execute concurrently and results can be
+    memoized by config. Functions called without a config use
+    StrategyConfig.from_globals(), which reflects the module-level parameters.
+    
+    top_k is the number of strongest ETFs bought on each trade. With top_k
+    above 1, a trade also sells every holding outside the top K, so at most K
+    ETFs are held. With top_k=1 (the original single-asset strategy) earlier
+    holdings are not sold and stay until a later trade resizes them, so
+    several ETFs can be held at once and cash can go negative.
+    """
+    window: int = WINDOW
+    min_history: int = MIN_HISTORY
+    initial_capital: float = INITIAL_CAPITAL
+    base_threshold: float = BASE_THRESHOLD
+    vol_window: int = VOL_WINDOW
+    ma_windows: tuple = tuple(MA_WINDOWS)
+    trailing_stop: float = TRAILING_STOP
+    max_drawdown_stop: float = MAX_DRAWDOWN_STOP
+    vix_high_threshold: float = VIX_HIGH_THRESHOLD
+    vix_extreme_threshold: float = VIX_EXTREME_THRESHOLD
+    top_k: int = TOP_K
+    weighting: str = WEIGHTING
+    
+    def __post_init__(self):
+        # Lists are not hashable; store MA windows as a tuple
+        object.__setattr__(self, 'ma_windows', tuple(self.ma_windows))
+        if int(self.top_k) < 1:
+            raise ValueError(f"top_k must be at least 1, got {self.top_k}")
+        object.__setattr__(self, 'top_k', int(self.top_k))
+        if self.weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting: {self.weighting} (expected one of {WEIGHTINGS})")
+    
+    @classmethod
+    def from_globals(cls):
+        """Build a config from the current module-level parameters"""
+        return cls(
+            window=WINDOW,
+            min_history=MIN_HISTORY,
+            initial_capital=INITIAL_CAPITAL,
+            base_threshold=BASE_THRESHOLD,
+            vol_window=VOL_WINDOW,
+            ma_windows=MA_WINDOWS,
+            trailing_stop=TRAILING_STOP,
+            max_drawdown_stop=MAX_DRAWDOWN_STOP,
+            vix_high_threshold=VIX_HIGH_THRESHOLD,
+            vix_extreme_threshold=VIX_EXTREME_THRESHOLD,
+            top_k=TOP_K,
+            weighting=WEIGHTING,
+        )
+    
+    def replace(self, **changes):
+        """Return a copy of the config with some parameters changed"""
+        return replace(self, **changes)
+
+def _load_histories(symbols, start_date, end_date, store, offline, provider):
+    """
+    Load close prices for several tickers, topping up the local store if one is given
+    
+    Only the bars after the last stored date are fetched. The last stored bar is
+    fetched again and compared; if it changed (a dividend or split re-adjusted the
+    history) the full history is fetched again and replaces the stored one. All
+    fetches go through the provider in batches so they can run concurrently.
+    
+    Args:
+        symbols: List of ticker symbols
+        start_date: First date required (inclusive)
+        end_date: Last date required (exclusive)
+        store: PriceStore instance, or None to always fetch from the provider
+        offline: Never call the provider; serve whatever the store holds
+        provider: DataProvider used for fetching
+    
+    Returns:
+        Dictionary mapping ticker symbol to a Series of close prices
+    """
+    if store is None:
+        fetched = provider.fetch_many({symbol: start_date for symbol in symbols}, end_date)
+        return {symbol: fetched.get(symbol, pd.Series(dtype=float, name=symbol))
+                for symbol in symbols}
+    
+    start_iso = price_store._to_iso(start_date)
+    full, top_up = {}, {}
+    for symbol in symbols:
+        coverage = store.coverage(symbol)
+        if coverage is None or coverage['start'] > start_iso:
+            full[symbol] = start_date
+        elif coverage['checked'] is None or coverage['checked'] < end_date:
+            top_up[symbol] = coverage
+    
+    if not offline:
+        for symbol, hist in provider.fetch_many(full, end_date).items():
+            if len(hist) > 0:
+                store.write(symbol, hist, start_date=start_date, checked=end_date, replace=True)
+        
+        updates = provider.fetch_many(
+            {symbol: coverage['last'] for symbol, coverage in top_up.items()}, end_date)
+        adjusted = {}
+        for symbol, update in updates.items():
+            coverage = top_up[symbol]
+            stored_last = store.read(symbol, coverage['last'], end_date)
+            overlap = update.index.intersection(stored_last.index)
+            if len(overlap) > 0 and not np.allclose(
+                    update.loc[overlap].values, stored_last.loc[overlap].values, rtol=1e-6):
+                print(f"History for {symbol} was re-adjusted, downloading it again...")
+                adjusted[symbol] = coverage['start']
+            else:
+                # Also record an empty top-up (holiday, before the close) as checked;
+                # failed fetches are left out by fetch_many and stay unchecked
+                store.write(symbol, update, checked=end_date)
+        
+        for symbol, hist in provider.fetch_many(adjusted, end_date).items():
+            if len(hist) > 0:
+                store.write(symbol, hist, start_date=adjusted[symbol], checked=end_date,
+                            replace=True)
+    
+    return {symbol: store.read(symbol, start_date, end_date) for symbol in symbols}
+
+@profiling.timed()
+def download_data(start_date, store=PRICE_STORE, offline=OFFLINE, provider=None, tickers=None):
     """
     Download historical data for ETFs and VIX
     
+    Prices are kept in a local price store so that later calls only fetch the
+    bars after the last stored date. With offline=True the data is served from
+    the store alone, which allows running the whole pipeline without a network.
+    
     Args:
         start_date: Start date for data download
+        store: Path to the local price store, a PriceStore instance, or None
+               to bypass the store and always download the full history
+        offline: Read from the store only, without any network access
+        provider: DataProvider to fetch from (defaults to data_providers.default_provider())
+        tickers: List of ETFs to trade (defaults to ETFS)
     
     Returns:
         DataFrame with adjusted close prices for ETFs and VIX
     """
-    # List of ETFs to trade
-    etfs = ['SPY', 'XLK', 'XLV', 'XLE', 'XLF', 'XLI', 'XLY']
+    etfs = list(tickers) if tickers is not None else ETFS
+    end_date = datetime.now().strftime('%Y-%m-%d')
     
-    # Download data for ETFs
-    data = pd.DataFrame()
-    download_failed = False
+    if isinstance(store, str):
+        store = price_store.PriceStore(store)
+    if provider is None:
+        provider = data_providers.default_provider()
     
-    for etf in etfs:
-        try:
-            print(f"Downloading data for {etf}...")
-            ticker = yf.Ticker(etf)
-            hist = ticker.history(start=start_date, end=datetime.now().strftime('%Y-%m-%d'))['Close']
-            if len(hist) == 0:
-                print(f"Warning: No data available for {etf}")
-                download_failed = True
-                break
-            else:
-                print(f"Downloaded {len(hist)} data points for {etf}")
-                # Convert index to date only (remove time and timezone info)
-                hist.index = hist.index.date
-                data[etf] = hist
-        except Exception as e:
-            print(f"Error downloading {etf}: {str(e)}")
-            download_failed = True
-            break
-    
-    if download_failed:
+    histories = _load_histories(etfs + ['^VIX'], start_date, end_date, store, offline, provider)
+    
+    # Collect ETF data
+    data = pd.DataFrame()
+    missing = [etf for etf in etfs if len(histories[etf]) == 0]
+    for etf in missing:
+        print(f"Warning: No data available for {etf}")
+    if missing:
         print("Failed to download complete ETF data")
         return None
-        
-    # Download VIX data
-    try:
-        print("Downloading VIX data...")
-        vix = yf.Ticker('^VIX')
-        vix_hist = vix.history(start=start_date, end=datetime.now().strftime('%Y-%m-%d'))['Close']
-        if len(vix_hist) == 0:
-            print("Warning: No VIX data available")
-            return None
-        else:
-            print(f"Downloaded {len(vix_hist)} data points for VIX")
-            # Convert index to date only (remove time and timezone info)
-            vix_hist.index = vix_hist.index.date
-            data['VIX'] = vix_hist
-    except Exception as e:
-        print(f"Error downloading VIX: {str(e)}")
+    
+    for etf in etfs:
+        print(f"Loaded {len(histories[etf])} data points for {etf}")
+        data[etf] = histories[etf]
+    
+    # Collect VIX data
+    vix_hist = histories['^VIX']
+    if len(vix_hist) == 0:
+        print("Warning: No VIX data available")
         return None
+    print(f"Loaded {len(vix_hist)} data points for VIX")
+    data['VIX'] = vix_hist
     
     # Check for missing values before cleaning
     print("\nMissing values before cleaning:")
@@ -104,6 +239,110 @@ def download_data(start_date):
     
     return data_cleaned
 
+def save_dataset(data, path):
+    """
+    Freeze a downloaded dataset to a snapshot file
+    
+    Args:
+        data: DataFrame returned by download_data
+        path: Target file; the format follows the extension (.csv, .parquet,
+              .pkl, or .npz for a compact float64 price_panel.PricePanel)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.endswith('.npz'):
+        price_panel.PricePanel.from_frame(data).save(path)
+        return
+    frame = data.copy()
+    frame.index = pd.DatetimeIndex(pd.to_datetime(frame.index), name='Date')
+    if path.endswith('.parquet'):
+        frame.to_parquet(path)
+    elif path.endswith('.pkl'):
+        frame.to_pickle(path)
+    else:
+        frame.to_csv(path)
+
+def load_dataset(path):
+    """
+    Load a dataset snapshot written by save_dataset
+    
+    Args:
+        path: Snapshot file (.csv, .parquet, .pkl or .npz)
+    
+    Returns:
+        DataFrame indexed by date, in the same layout as download_data
+    """
+    if path.endswith('.npz'):
+        return price_panel.PricePanel.load(path).to_frame()
+    if path.endswith('.parquet'):
+        data = pd.read_parquet(path)
+    elif path.endswith('.pkl'):
+        data = pd.read_pickle(path)
+    else:
+        data = pd.read_csv(path, index_col=0)
+    data.index = pd.to_datetime(data.index).date
+    return data.astype(float)
+
+def _energy_prefix(values):
+    """
+    Cumulative sums behind ma_energy_matrix, shared by every window length
+    
+    Args:
+        values: 2-D array of prices (days x tickers)
+    
+    Returns:
+        Tuple (csum, count, offset): cumulative sums of the prices centred on
+        each column's first valid price, cumulative counts of valid prices,
+        and the per-column offsets
+    """
+    valid = np.isfinite(values)
+    first_valid = valid.argmax(axis=0)
+    offset = np.where(valid.any(axis=0), values[first_valid, np.arange(values.shape[1])], 0.0)
+    
+    csum = np.cumsum(np.where(valid, values - offset, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    return csum, count, offset
+
+def _energy_from_prefix(values, prefix, window):
+    """Finish ma_energy_matrix for one window from precomputed cumulative sums"""
+    csum, count, offset = prefix
+    energy = np.full(values.shape, np.nan)
+    if window < 1 or len(values) < window:
+        return energy
+    
+    window_sum = csum[window - 1:].copy()
+    window_sum[1:] -= csum[:-window]
+    window_count = count[window - 1:].copy()
+    window_count[1:] -= count[:-window]
+    
+    ma = window_sum / window + offset
+    with np.errstate(divide='ignore', invalid='ignore'):
+        energy[window - 1:] = np.where(window_count == window,
+                                       (values[window - 1:] - ma) / ma, np.nan)
+    return energy
+
+def ma_energy_matrix(values, window):
+    """
+    Calculate the moving average energy indicator for every column of a price matrix
+    
+    Rolling means come from differences of a cumulative sum, so the cost is
+    O(days * tickers) regardless of the window length. Each column is centred on
+    its first valid price before summing to keep the cumulative sum small. A
+    window containing a missing price yields NaN, as with pandas rolling means.
+    
+    Args:
+        values: 2-D array of prices (days x tickers)
+        window: Rolling window size
+    
+    Returns:
+        2-D float array of MA energy values, NaN where the window is incomplete
+    """
+    values = np.asarray(values, dtype=float)
+    if window < 1 or len(values) < window:
+        return np.full(values.shape, np.nan)
+    return _energy_from_prefix(values, _energy_prefix(values), window)
+
 def ma_energy(prices, window):
     """
     Calculate moving average energy indicator
@@ -115,28 +354,126 @@ def ma_energy(prices, window):
     Returns:
         Series of MA energy values
     """
-    ma = prices.rolling(window=window).mean()
-    energy = (prices - ma) / ma
-    return energy
+    energy = ma_energy_matrix(prices.to_numpy(dtype=float)[:, None], window)[:, 0]
+    return pd.Series(energy, index=prices.index, name=prices.name)
 
-def generate_signals(data):
+class IndicatorCache:
+    """
+    Per-dataset cache of MA energy series keyed by ticker and window length
+    
+    The cumulative sums of the price matrix are computed once, on first use.
+    Every (ticker, window) energy series is then derived from them at most
+    once and reused by later backtests, so parameter sweeps over the window
+    length stop recomputing indicators. Results are identical to
+    ma_energy_matrix on the full data.
+    """
+    
+    def __init__(self, data):
+        self.index = data.index
+        self.columns = list(data.columns)
+        self._column_index = {col: i for i, col in enumerate(self.columns)}
+        self._values = data.to_numpy(dtype=float)
+        self._prefix = None
+        self._energy = {}
+    
+    def matches(self, data):
+        """Check whether the cache was built for data with this layout"""
+        return (list(data.columns) == self.columns and len(data) == len(self.index)
+                and data.index.equals(self.index))
+    
+    def precompute(self, windows, tickers=None):
+        """
+        Compute the energy of every ticker for a grid of windows
+        
+        Args:
+            windows: Iterable of window lengths
+            tickers: Tickers to compute (defaults to all columns)
+        """
+        for window in windows:
+            self.energy_matrix(tickers or self.columns, window)
+    
+    def energy_matrix(self, tickers, window):
+        """
+        Return MA energy for several tickers as a 2-D array (days x tickers)
+        
+        Args:
+            tickers: List of column labels
+            window: Rolling window size
+        """
+        missing = [col for col in tickers if (col, window) not in self._energy]
+        if missing:
+            if self._prefix is None:
+                self._prefix = _energy_prefix(self._values)
+            cols = [self._column_index[col] for col in missing]
+            prefix = tuple(part[..., cols] for part in self._prefix)
+            energy = _energy_from_prefix(self._values[:, cols], prefix, window)
+            for i, col in enumerate(missing):
+                self._energy[(col, window)] = energy[:, i]
+        
+        if not tickers:
+            return np.empty((len(self.index), 0))
+        return np.column_stack([self._energy[(col, window)] for col in tickers])
+    
+    def energy(self, ticker, window):
+        """Return MA energy of one ticker as a Series"""
+        return pd.Series(self.energy_matrix([ticker], window)[:, 0], index=self.index, name=ticker)
+
+def tradable_mask(columns, tradable=None):
+    """
+    Build a boolean mask of the tradable columns
+    
+    Args:
+        columns: Column labels of the price data
+        tradable: Boolean mask or list of tradable tickers; by default every
+                  column except the benchmark and VIX
+    
+    Returns:
+        Boolean NumPy array aligned with columns
+    """
+    if tradable is None:
+        return np.array([col not in NON_TRADABLE for col in columns])
+    tradable = list(tradable)
+    if len(tradable) == len(columns) and all(isinstance(flag, (bool, np.bool_)) for flag in tradable):
+        return np.array(tradable, dtype=bool)
+    return np.array([col in tradable for col in columns])
+
+@profiling.timed()
+def generate_signals(data, tradable=None, config=None, indicators=None):
     """
     Generate trading signals based on MA energy
     
+    All tradable columns are processed in a single pass over the price matrix.
+    Columns outside the tradable universe get a signal of zero, so they are
+    never selected.
+    
     Args:
-        data: Price data for ETFs
+        data: Price data for ETFs, as a DataFrame or a price_panel.PricePanel
+        tradable: Boolean mask or list of tradable tickers (see tradable_mask)
+        config: StrategyConfig (defaults to the module-level parameters)
+        indicators: IndicatorCache built for this data, to reuse energy series
     
     Returns:
         DataFrame with signal strengths for each ETF
     """
-    signals = pd.DataFrame(0, index=data.index, columns=data.columns)
-    for etf in data.columns:
-        if etf == 'SPY':
-            continue
-        signals[etf] = ma_energy(data[etf], WINDOW)
-    return signals
+    config = config or StrategyConfig.from_globals()
+    if isinstance(data, price_panel.PricePanel):
+        if indicators is not None:
+            raise ValueError("IndicatorCache is built from a DataFrame; pass panel.to_frame()")
+        index, columns, prices = pd.Index(data.dates), data.tickers, data.values
+    else:
+        index, columns, prices = data.index, data.columns, None
+    mask = tradable_mask(columns, tradable)
+    values = np.zeros((len(index), len(columns)))
+    if indicators is not None and not indicators.matches(data):
+        raise ValueError("IndicatorCache was built for different data")
+    if mask.any() and indicators is not None:
+        values[:, mask] = indicators.energy_matrix(list(data.columns[mask]), config.window)
+    elif mask.any():
+        prices = data.to_numpy(dtype=float) if prices is None else prices
+        values[:, mask] = ma_energy_matrix(prices[:, mask], config.window)
+    return pd.DataFrame(values, index=index, columns=columns)
 
-def get_target_weights(signals, current_date, current_positions, data, entry_prices):
+def get_target_weights(signals, current_date, current_positions, data, entry_prices, config=None):
     """
     Calculate target portfolio weights based on signals and risk management rules
     
@@ -146,25 +483,27 @@ def get_target_weights(signals, current_date, current_positions, data, entry_pri
         current_positions: Current portfolio positions
         data: Price data for ETFs
         entry_prices: Entry prices for current positions
+        config: StrategyConfig (defaults to the module-level parameters)
     
     Returns:
         Dictionary of target weights for each ETF
     """
+    config = config or StrategyConfig.from_globals()
     target_weights = {}
     
     # Get current VIX level and calculate volatility adjustment
     vix_level = data.loc[current_date, 'VIX']
     vol_adj = 1.0
     
-    if vix_level > VIX_EXTREME_THRESHOLD:
+    if vix_level > config.vix_extreme_threshold:
         # Exit all positions in extreme volatility
         return target_weights
-    elif vix_level > VIX_HIGH_THRESHOLD:
+    elif vix_level > config.vix_high_threshold:
         # Reduce position sizes in high volatility
         vol_adj = 0.5
     
     # Calculate dynamic threshold based on market conditions
-    current_threshold = BASE_THRESHOLD
+    current_threshold = config.base_threshold
     
     # Check stop loss conditions for current positions
     for etf, shares in current_positions.items():
@@ -174,44 +513,217 @@ def get_target_weights(signals, current_date, current_positions, data, entry_pri
             drawdown = (current_price - entry_price) / entry_price
             
             # Apply trailing stop and maximum drawdown stop
-            if drawdown < -MAX_DRAWDOWN_STOP:
+            if drawdown < -config.max_drawdown_stop:
                 continue
     
-    # Find strongest signal above threshold
+    # Hold the strongest signals above threshold
     current_signals = signals.loc[current_date]
-    max_signal = current_signals.max()
+    ranked = current_signals.nlargest(config.top_k, keep='first')
+    ranked = ranked[ranked > current_threshold]
     
-    if max_signal > current_threshold:
-        best_etf = current_signals.idxmax()
-        target_weights[best_etf] = 1.0 * vol_adj
+    if len(ranked):
+        weights = allocation_weights(ranked.to_numpy(dtype=float)[None, :],
+                                     np.ones((1, len(ranked)), dtype=bool), config.weighting)[0]
+        for etf, weight in zip(ranked.index, weights.tolist()):
+            target_weights[etf] = weight * vol_adj
     
     return target_weights
 
-def backtest(data, signals):
+def rank_candidates(signal_values, k):
+    """
+    Find the k strongest signals of every day without sorting whole rows
+    
+    The k-th largest value of each row is located with np.partition, so the
+    cost grows linearly with the number of candidates. Ties are broken in
+    favour of the lower column index, like pandas nlargest(keep='first') and
+    idxmax.
+    
+    Args:
+        signal_values: 2-D array of signal strengths (days x candidates); NaN
+                       signals rank last
+        k: Number of candidates to keep per day
+    
+    Returns:
+        Tuple (columns, ranked): 2-D arrays (days x min(k, candidates)) of
+        column indices and their signals, strongest first
+    """
+    filled = np.where(np.isnan(signal_values), -np.inf, signal_values)
+    n_days, n_candidates = filled.shape
+    k = min(k, n_candidates)
+    if k == 0:
+        return np.zeros((n_days, 0), dtype=np.int64), np.zeros((n_days, 0))
+    if k == 1:
+        best = filled.argmax(axis=1)[:, None]
+        return best, np.take_along_axis(filled, best, axis=1)
+    
+    # Keep everything above the k-th largest value plus the first columns tied with it
+    kth = np.partition(filled, n_candidates - k, axis=1)[:, n_candidates - k][:, None]
+    above = filled > kth
+    tied = filled == kth
+    needed = k - above.sum(axis=1, keepdims=True)
+    keep = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+    columns = np.nonzero(keep)[1].reshape(n_days, k)
+    ranked = np.take_along_axis(filled, columns, axis=1)
+    
+    # Strongest first; the columns are already ascending, so a stable sort keeps ties in column order
+    order = np.argsort(-ranked, axis=1, kind='stable')
+    return np.take_along_axis(columns, order, axis=1), np.take_along_axis(ranked, order, axis=1)
+
+def allocation_weights(ranked, selected, weighting):
+    """
+    Split a target exposure of 1.0 across the selected candidates
+    
+    Args:
+        ranked: Signals of the ranked candidates (... x k)
+        selected: Boolean mask of the candidates that are bought (... x k)
+        weighting: 'equal' for equal weights or 'signal' for weights
+                   proportional to the (non-negative part of the) signal;
+                   'signal' falls back to equal weights when every selected
+                   signal is zero or negative
+    
+    Returns:
+        Array of weights shaped like ranked, zero where not selected
+    """
+    n_selected = selected.sum(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        equal = np.where(selected, 1.0 / n_selected, 0.0)
+        if weighting == 'equal':
+            return equal
+        if weighting != 'signal':
+            raise ValueError(f"Unknown weighting: {weighting}")
+        strength = np.where(selected, np.clip(ranked, 0.0, None), 0.0)
+        total = strength.sum(axis=-1, keepdims=True)
+        return np.where(total > 0, strength / total, equal)
+
+def _target_plan(signal_values, vix_values, config):
+    """
+    Compute the daily trade decision of get_target_weights for all days at once
+    
+    Args:
+        signal_values: 2-D array of signal strengths (days x candidates)
+        vix_values: 1-D array of VIX levels
+        config: StrategyConfig
+    
+    Returns:
+        Tuple (best, weight): 2-D arrays (days x top_k) with the column index
+        of each ETF to buy, strongest first (-1 for an unused slot), and its
+        target weight
+    """
+    columns, ranked = rank_candidates(signal_values, config.top_k)
+    
+    # Exit in extreme volatility, half size in high volatility
+    selected = (ranked > config.base_threshold) & ~(vix_values > config.vix_extreme_threshold)[:, None]
+    vol_adj = np.where(vix_values > config.vix_high_threshold, 0.5, 1.0)[:, None]
+    weight = allocation_weights(ranked, selected, config.weighting) * vol_adj
+    
+    return np.where(selected, columns, -1), np.where(selected, weight, 0.0)
+
+def _simulate(prices, best, weight, position_index, n_positions, min_history, initial_capital):
+    """
+    Run the backtest trade loop on preallocated arrays
+    
+    The arithmetic follows the reference loop in backtest(engine='loop') step by
+    step, including the order in which holdings are summed, so the results are
+    bit-identical. With more than one slot, a trade day also sells the
+    holdings that are not among the day's chosen columns.
+    
+    Args:
+        prices: 2-D array of candidate prices (days x candidates)
+        best: Column indices to buy on each day (days x slots), -1 for an unused slot
+        weight: Target weight of each slot (days x slots)
+        position_index: Column in the positions array for each candidate, -1 if untracked
+        n_positions: Number of columns in the positions array
+        min_history: Days without trading at the start
+        initial_capital: Starting cash
+    
+    Returns:
+        Tuple (values, returns, positions) of NumPy arrays
+    """
+    n_days = len(prices)
+    values = np.full(n_days, initial_capital)
+    returns = np.zeros(n_days)
+    positions = np.zeros((n_days, n_positions), dtype=np.int64)
+    
+    current = np.zeros(n_positions, dtype=np.int64)
+    holdings = {}  # Candidate column -> shares, in the order positions were opened
+    cash = initial_capital
+    best_list = best.tolist()
+    weight_list = weight.tolist()
+    rebalance = best.shape[1] > 1
+    
+    for i in range(min_history, n_days):
+        row = prices[i].tolist()
+        
+        total_value = cash
+        for col, shares in holdings.items():
+            total_value += shares * row[col]
+        values[i] = total_value
+        positions[i] = current
+        
+        if rebalance and max(best_list[i]) >= 0:
+            for col in [col for col in holdings if col not in best_list[i]]:
+                del holdings[col]
+                if position_index[col] >= 0:
+                    current[position_index[col]] = 0
+        
+        for col, target_weight in zip(best_list[i], weight_list[i]):
+            if col < 0:
+                continue
+            current_price = row[col]
+            target_shares = int(total_value * target_weight / current_price)
+            holdings[col] = target_shares
+            if position_index[col] >= 0:
+                current[position_index[col]] = target_shares
+        
+        cash = total_value - sum(shares * row[col] for col, shares in holdings.items())
+    
+    start = max(min_history, 1)
+    if start < n_days:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[start:] = values[start:] / values[start - 1:-1] - 1
+    
+    return values, returns, positions
+
+@profiling.timed()
+def backtest(data, signals, engine='array', config=None):
     """
     Perform strategy backtest
     
     Args:
-        data: Price data for ETFs and VIX
+        data: Price data for ETFs and VIX, as a DataFrame or a price_panel.PricePanel
         signals: Signal strengths for ETFs
+        engine: 'array' runs the trade loop on NumPy arrays; 'loop' is the
+                reference implementation stepping through the DataFrames day
+                by day. Both produce identical results.
+        config: StrategyConfig (defaults to the module-level parameters).
+                With top_k above 1 each trade sells the holdings outside the
+                top K; with top_k=1 earlier holdings are kept (see StrategyConfig).
     
     Returns:
         DataFrame with portfolio values and returns
     """
+    config = config or StrategyConfig.from_globals()
+    if engine == 'array':
+        return _backtest_array(data, signals, config)
+    if engine != 'loop':
+        raise ValueError(f"Unknown backtest engine: {engine}")
+    if isinstance(data, price_panel.PricePanel):
+        data = data.to_frame()
+    
     portfolio = pd.DataFrame(index=data.index)
     portfolio['value'] = 0.0
     portfolio['return'] = 0.0
     
     current_positions = {}  # Dictionary to track current positions
     entry_prices = {}      # Dictionary to track entry prices
-    cash = INITIAL_CAPITAL  # Initial cash
+    cash = config.initial_capital  # Initial cash
     
     # Create positions DataFrame only for ETFs (exclude VIX)
     etf_columns = [col for col in data.columns if col != 'VIX']
     positions = pd.DataFrame(0, index=data.index, columns=etf_columns)
     
     for i, current_date in enumerate(data.index):
-        if i < MIN_HISTORY:
+        if i < config.min_history:
             portfolio.loc[current_date, 'value'] = cash
             continue
         
@@ -235,7 +747,12 @@ def backtest(data, signals):
         
         # Get target weights
         target_weights = get_target_weights(signals, current_date, current_positions, 
-                                          data, entry_prices)
+                                          data, entry_prices, config)
+        
+        # With top_k > 1, sell the holdings that left the top K
+        if config.top_k > 1 and target_weights:
+            for etf in [etf for etf in current_positions if etf not in target_weights]:
+                del current_positions[etf]
         
         # Adjust positions based on target weights
         for etf, target_weight in target_weights.items():
@@ -253,61 +770,194 @@ def backtest(data, signals):
     
     return portfolio, positions
 
-def rolling_backtest(data, window_years=5):
+def _backtest_array(data, signals, config):
+    """Array-backed implementation of backtest(engine='array')"""
+    candidates = list(signals.columns)
+    if isinstance(data, price_panel.PricePanel):
+        index, columns = pd.Index(data.dates), data.tickers
+        vix = data.column('VIX').astype(float)
+        prices = data.select(candidates).values.astype(float)
+    else:
+        index, columns = data.index, data.columns
+        vix = data['VIX'].to_numpy(dtype=float)
+        prices = data[candidates].to_numpy(dtype=float)
+    if not signals.index.equals(index):
+        signals = signals.loc[index]
+    etf_columns = [col for col in columns if col != 'VIX']
+    
+    best, weight = _target_plan(signals.to_numpy(dtype=float), vix, config)
+    position_index = [etf_columns.index(col) if col in etf_columns else -1 for col in candidates]
+    values, returns, positions = _simulate(
+        prices, best, weight, position_index,
+        len(etf_columns), config.min_history, config.initial_capital)
+    
+    portfolio = pd.DataFrame({'value': values, 'return': returns}, index=index)
+    positions = pd.DataFrame(positions, index=index, columns=etf_columns)
+    return portfolio, positions
+
+def _results_frame(data, bounds, strategy, spy):
     """
-    Perform rolling window backtest with non-overlapping windows
+    Assemble the rolling_backtest results table
+    
+    Args:
+        data: Full price data
+        bounds: List of (start, end) window index pairs
+        strategy: Strategy metric arrays from the metrics module
+        spy: Benchmark metric arrays from the metrics module
+    
+    Returns:
+        DataFrame with one row per window
+    """
+    return pd.DataFrame({
+        'Start Date': [data.index[start_idx] for start_idx, _ in bounds],
+        'End Date': [data.index[end_idx - 1] for _, end_idx in bounds],
+        'Window Days': [end_idx - start_idx for start_idx, end_idx in bounds],
+        'Strategy Return': strategy['annual_return'],
+        'Strategy Volatility': strategy['annual_volatility'],
+        'Strategy Sharpe': strategy['sharpe'],
+        'Strategy Max Drawdown': strategy['max_drawdown'],
+        'SPY Return': spy['annual_return'],
+        'SPY Volatility': spy['annual_volatility'],
+        'SPY Sharpe': spy['sharpe'],
+        'SPY Max Drawdown': spy['max_drawdown'],
+        'Average Turnover': strategy['turnover'],
+        'Strategy Sortino': strategy['sortino'],
+        'Strategy Calmar': strategy['calmar'],
+        'Strategy Hit Rate': strategy['hit_rate'],
+    })
+
+_worker_state = {}
+
+def _init_window_worker(path, columns, index, config):
+    """Attach a pool worker to the memory-mapped price matrix"""
+    _worker_state['prices'] = np.load(path, mmap_mode='r')
+    _worker_state['columns'] = columns
+    _worker_state['index'] = index
+    _worker_state['config'] = config
+
+def _evaluate_window(bounds):
+    """Run an independent backtest for one window inside a pool worker"""
+    start_idx, end_idx = bounds
+    config = _worker_state['config']
+    window_data = pd.DataFrame(np.array(_worker_state['prices'][start_idx:end_idx]),
+                               index=_worker_state['index'][start_idx:end_idx],
+                               columns=_worker_state['columns'])
+    portfolio, _ = backtest(window_data, generate_signals(window_data, config=config), config=config)
+    return portfolio['value'].to_numpy(), portfolio['return'].to_numpy()
+
+def _evaluate_windows_parallel(data, bounds, workers, config):
+    """
+    Evaluate independent windows on a process pool
+    
+    The price matrix is written once to a memory-mapped .npy file that every
+    worker maps read-only, so only the window bounds are sent per task.
+    The (values, returns) paths come back in window order.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'prices.npy')
+        np.save(path, data.to_numpy(dtype=float))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_window_worker,
+                                 initargs=(path, list(data.columns), data.index, config)) as executor:
+            return list(executor.map(_evaluate_window, bounds))
+
+def window_bounds(n_days, window_days, step_days=None, expanding=False):
+    """
+    List the (start, end) index pairs of rolling_backtest windows
+    
+    Args:
+        n_days: Number of rows in the data
+        window_days: Window length (the minimum length for expanding windows)
+        step_days: Distance between consecutive windows; defaults to window_days,
+                   which gives non-overlapping windows
+        expanding: Anchor every window at the first day and grow it by step_days
+    
+    Returns:
+        List of (start, end) tuples, end exclusive
+    """
+    step_days = step_days or window_days
+    if expanding:
+        return [(0, end_idx) for end_idx in range(window_days, n_days + 1, step_days)]
+    return [(start_idx, start_idx + window_days)
+            for start_idx in range(0, n_days - window_days + 1, step_days)]
+
+@profiling.timed()
+def rolling_backtest(data, window_years=5, single_pass=False, workers=None, step_days=None,
+                     expanding=False, config=None, indicators=None, portfolio=None):
+    """
+    Perform rolling window backtest
+    
+    Windows are non-overlapping by default. step_days makes them overlap and
+    expanding=True anchors them all at the first day (walk-forward analysis).
+    
+    By default every window is an independent backtest: signals are generated
+    from the window's own prices and the first min_history days are warm-up.
+    With single_pass=True, signals and the backtest are computed once over the
+    full history and each window is evaluated as a slice of that one portfolio
+    path. Window metrics then come from prefix sums over the full path, so even
+    a daily step over the whole history costs little more than one backtest.
     
     Args:
         data: DataFrame with price data
         window_years: Length of each window in years
+        single_pass: Evaluate windows as slices of one full-history backtest
+        workers: Number of worker processes for independent windows; None or 1
+                 runs them in this process. Ignored with single_pass=True.
+        step_days: Trading days between window starts (or ends, when expanding)
+        expanding: Use anchored windows that all start on the first day
+        config: StrategyConfig (defaults to the module-level parameters)
+        indicators: IndicatorCache built for data. Independent windows then
+                    take their signals from the cached full-history energy,
+                    blanked for each window's warm-up; the values equal a
+                    per-window computation up to floating-point rounding.
+                    Not used by process-pool workers.
+        portfolio: Portfolio from an earlier full-history backtest of data with
+                   the same config; single_pass then slices it instead of
+                   running the backtest again
     """
-    results = []
+    config = config or StrategyConfig.from_globals()
     window_days = window_years * 252  # Approximate trading days in a year
+    bounds = window_bounds(len(data), window_days, step_days, expanding)
     
-    # Calculate non-overlapping windows
-    start_idx = 0
-    while start_idx + window_days <= len(data):
-        window_data = data.iloc[start_idx:start_idx + window_days]
-        
-        # Run backtest for this window
-        signals = generate_signals(window_data)
-        portfolio, positions = backtest(window_data, signals)
-        
-        # Calculate metrics for this window
-        strategy_return = calculate_annual_return(portfolio['value'])
-        strategy_vol = calculate_annual_volatility(portfolio['return'])
-        strategy_sharpe = calculate_sharpe_ratio(portfolio['return'])
-        strategy_max_dd = calculate_max_drawdown(portfolio['value'])
-        
-        # Calculate benchmark (SPY) metrics
-        spy_returns = window_data['SPY'].pct_change().fillna(0)
-        spy_return = calculate_annual_return(window_data['SPY'])
-        spy_vol = calculate_annual_volatility(spy_returns)
-        spy_sharpe = calculate_sharpe_ratio(spy_returns)
-        spy_max_dd = calculate_max_drawdown(window_data['SPY'])
-        
-        # Calculate average turnover
-        avg_turnover = calculate_average_turnover(portfolio['value'])
-        
-        results.append({
-            'Start Date': window_data.index[0],
-            'End Date': window_data.index[-1],
-            'Window Days': len(window_data),
-            'Strategy Return': strategy_return,
-            'Strategy Volatility': strategy_vol,
-            'Strategy Sharpe': strategy_sharpe,
-            'Strategy Max Drawdown': strategy_max_dd,
-            'SPY Return': spy_return,
-            'SPY Volatility': spy_vol,
-            'SPY Sharpe': spy_sharpe,
-            'SPY Max Drawdown': spy_max_dd,
-            'Average Turnover': avg_turnover
-        })
+    if not bounds:
+        return pd.DataFrame()
+    
+    if single_pass:
+        if portfolio is None:
+            signals = generate_signals(data, config=config, indicators=indicators)
+            portfolio, _ = backtest(data, signals, config=config)
+        strategy = metrics.window_metrics(portfolio['value'].to_numpy(dtype=float),
+                                          portfolio['return'].to_numpy(dtype=float), bounds)
+    else:
+        if workers is not None and workers > 1 and len(bounds) > 1:
+            paths = _evaluate_windows_parallel(data, bounds, workers, config)
+        else:
+            if indicators is not None:
+                full_signals = generate_signals(data, config=config, indicators=indicators)
+                tradable = tradable_mask(data.columns)
+            paths = []
+            for start_idx, end_idx in bounds:
+                # Run backtest for this window
+                window_data = data.iloc[start_idx:end_idx]
+                if indicators is not None:
+                    # Rolling means only look back, so the window's own signals are the
+                    # full-history ones with the window's warm-up blanked out
+                    signals = full_signals.iloc[start_idx:end_idx].copy()
+                    signals.iloc[:config.window - 1, tradable] = np.nan
+                else:
+                    signals = generate_signals(window_data, config=config)
+                portfolio, positions = backtest(window_data, signals, config=config)
+                paths.append((portfolio['value'].to_numpy(), portfolio['return'].to_numpy()))
         
-        # Move to next non-overlapping window
-        start_idx += window_days
+        # Calculate metrics for all windows at once
+        strategy = metrics.compute_metrics([values for values, _ in paths],
+                                           [returns for _, returns in paths])
     
-    return pd.DataFrame(results)
+    # Calculate benchmark (SPY) metrics
+    spy_prices = data['SPY'].to_numpy(dtype=float)
+    spy_returns = data['SPY'].pct_change().fillna(0).to_numpy()
+    spy = metrics.window_metrics(spy_prices, spy_returns, bounds)
+    
+    return _results_frame(data, bounds, strategy, spy)
 
 def calculate_annual_volatility(returns):
     """Calculate annualized volatility"""
@@ -381,6 +1031,9 @@ def plot_rolling_metrics(results):
     Args:
         results: DataFrame with rolling window results
     """
+    # Imported here so that importing model (e.g. in worker processes) does not load matplotlib
+    import matplotlib.pyplot as plt
+    
     fig, axes = plt.subplots(2, 2, figsize=(15, 10))
     
     # Plot Returns
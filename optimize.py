@@ -1,21 +1,44 @@
+import argparse
+import time
 import numpy as np
 import pandas as pd
-from skopt import gp_minimize
-from skopt.space import Real, Integer
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import model
+import profiling
+import result_cache
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
-def objective(params):
+OPTIMIZATION_START_DATE = '2010-01-01'  # Use a shorter time period to speed up optimization
+
+def load_data(data_path=None, start_date=OPTIMIZATION_START_DATE):
     """
-    Optimization objective function
+    Load the dataset used for a whole optimization run
+    
+    Args:
+        data_path: Frozen dataset snapshot (see model.save_dataset); when None the
+                   data is downloaded once with model.download_data
+        start_date: Start date for the download
+    
+    Returns:
+        DataFrame with price data, or None if no data is available
+    """
+    if data_path:
+        print(f"Loading frozen dataset from {data_path}...")
+        return model.load_dataset(data_path)
+    return model.download_data(start_date=start_date)
+
+def params_to_config(params):
+    """
+    Convert an optimizer parameter list into a StrategyConfig
     
     Args:
         params: Parameter list [base_threshold, vol_window, ma_window_1, ma_window_2, ma_window_3,
                         trailing_stop, max_drawdown_stop, vix_high, vix_extreme]
     Returns:
-        -avg_sharpe: Negative average Sharpe ratio (because we want to maximize Sharpe ratio, but the optimizer minimizes the objective)
+        model.StrategyConfig with integer windows
     """
     # Unpack parameters
     base_threshold, vol_window, ma_window_1, ma_window_2, ma_window_3, \
@@ -24,23 +47,44 @@ def objective(params):
     # Ensure MA windows are in ascending order
     ma_windows = sorted([int(ma_window_1), int(ma_window_2), int(ma_window_3)])
     
-    # Update model parameters
-    model.BASE_THRESHOLD = base_threshold
-    model.VOL_WINDOW = int(vol_window)
-    model.MA_WINDOWS = ma_windows
-    model.TRAILING_STOP = trailing_stop
-    model.MAX_DRAWDOWN_STOP = max_drawdown_stop
-    model.VIX_HIGH_THRESHOLD = vix_high
-    model.VIX_EXTREME_THRESHOLD = vix_extreme
+    return model.StrategyConfig(
+        base_threshold=float(base_threshold),
+        vol_window=int(vol_window),
+        ma_windows=tuple(ma_windows),
+        trailing_stop=float(trailing_stop),
+        max_drawdown_stop=float(max_drawdown_stop),
+        vix_high_threshold=float(vix_high),
+        vix_extreme_threshold=float(vix_extreme)
+    )
+
+@profiling.timed()
+def objective(params, data, cache=None, fingerprint=None, indicators=None):
+    """
+    Optimization objective function
+    
+    Points that map to the same effective StrategyConfig (the windows are cast
+    to int) are served from the result cache instead of being recomputed.
+    
+    Args:
+        params: Parameter list [base_threshold, vol_window, ma_window_1, ma_window_2, ma_window_3,
+                        trailing_stop, max_drawdown_stop, vix_high, vix_extreme]
+        data: Price data loaded once for the optimization run
+        cache: Optional result_cache.ResultCache
+        fingerprint: result_cache.data_fingerprint(data), computed once per run
+        indicators: model.IndicatorCache for data, shared across evaluations
+    Returns:
+        -avg_sharpe: Negative average Sharpe ratio (because we want to maximize Sharpe ratio, but the optimizer minimizes the objective)
+    """
+    config = params_to_config(params)
     
     try:
-        # Get data
-        data = model.download_data(start_date='2010-01-01')  # Use a shorter time period to speed up optimization
         if data is None or len(data) < 252:
             return 0
             
         # Run backtest
-        results = model.rolling_backtest(data)
+        results = result_cache.cached_rolling_backtest(data, config, cache=cache,
+                                                       fingerprint=fingerprint,
+                                                       indicators=indicators)
         if results.empty:
             return 0
             
@@ -57,11 +101,12 @@ def objective(params):
         print(f"Error in optimization: {str(e)}")
         return 0
 
-def optimize_parameters():
-    """Run parameter optimization"""
+def parameter_space():
+    """Define parameter space"""
+    # scikit-optimize is only needed by the driver process, not by objective workers
+    from skopt.space import Real, Integer
     
-    # Define parameter space
-    space = [
+    return [
         Real(0.1, 0.3, name='base_threshold'),           # BASE_THRESHOLD
         Integer(10, 30, name='vol_window'),              # VOL_WINDOW
         Integer(10, 30, name='ma_window_1'),             # MA_WINDOWS[0]
@@ -72,35 +117,178 @@ def optimize_parameters():
         Real(25, 40, name='vix_high'),                   # VIX_HIGH_THRESHOLD
         Real(35, 50, name='vix_extreme')                 # VIX_EXTREME_THRESHOLD
     ]
+
+def print_results(best_params, best_score):
+    """Print the optimal parameters"""
+    print("\nOptimization completed!")
+    print(f"Best average Sharpe ratio: {best_score:.4f}")
+    print("\nOptimal parameters:")
+    print(f"BASE_THRESHOLD = {best_params[0]:.3f}")
+    print(f"VOL_WINDOW = {int(best_params[1])}")
+    print(f"MA_WINDOWS = [{int(best_params[2])}, {int(best_params[3])}, {int(best_params[4])}]")
+    print(f"TRAILING_STOP = {best_params[5]:.3f}")
+    print(f"MAX_DRAWDOWN_STOP = {best_params[6]:.3f}")
+    print(f"VIX_HIGH_THRESHOLD = {best_params[7]:.1f}")
+    print(f"VIX_EXTREME_THRESHOLD = {best_params[8]:.1f}")
+
+def optimize_parameters(data=None, n_calls=50, n_random_starts=10, cache=None, random_state=None):
+    """
+    Run parameter optimization
+    
+    With a disk-backed cache and a fixed random_state, an interrupted run can
+    be restarted: the optimizer proposes the same points again and the earlier
+    evaluations are read back from the cache.
+    
+    Args:
+        data: Price data shared by every evaluation; loaded with load_data() when None
+        n_calls: Total number of evaluations
+        n_random_starts: Number of random explorations
+        cache: Optional result_cache.ResultCache for memoized evaluations
+        random_state: Seed for the optimizer
+    """
+    if data is None:
+        data = load_data()
+    if data is None:
+        print("No data available for optimization")
+        return None, None
+    
+    from skopt import gp_minimize
     
     # Run Bayesian optimization
     print("Starting parameter optimization...")
+    fingerprint = result_cache.data_fingerprint(data) if cache is not None else None
     result = gp_minimize(
-        objective,
-        space,
-        n_calls=50,        # Total number of evaluations
-        n_random_starts=10, # Number of random explorations
+        partial(objective, data=data, cache=cache, fingerprint=fingerprint,
+                indicators=model.IndicatorCache(data)),
+        parameter_space(),
+        n_calls=n_calls,                  # Total number of evaluations
+        n_random_starts=n_random_starts,  # Number of random explorations
         noise=0.1,         # Assume the objective function has some noise
+        random_state=random_state,
         verbose=True
     )
     
     # Extract optimal parameters
     best_params = result.x
     best_score = -result.fun  # Convert back to positive Sharpe ratio
+    print_results(best_params, best_score)
     
-    # Print results
-    print("\nOptimization completed!")
-    print(f"Best average Sharpe ratio: {best_score:.4f}")
-    print("\nOptimal parameters:")
-    print(f"BASE_THRESHOLD = {best_params[0]:.3f}")
-    print(f"VOL_WINDOW = {int(best_params[1])}")
-    print(f"MA_WINDOWS = [{int(best_params[2])}, {int(best_params[3])}, {int(best_params[4])}]")
-    print(f"TRAILING_STOP = {best_params[5]:.3f}")
-    print(f"MAX_DRAWDOWN_STOP = {best_params[6]:.3f}")
-    print(f"VIX_HIGH_THRESHOLD = {best_params[7]:.1f}")
-    print(f"VIX_EXTREME_THRESHOLD = {best_params[8]:.1f}")
+    return best_params, best_score
+
+_worker_data = {}
+
+def _init_objective_worker(data, cache_dir, fingerprint):
+    """Keep the optimization dataset and a result cache in a pool worker"""
+    _worker_data['data'] = data
+    _worker_data['cache'] = result_cache.ResultCache(cache_dir) if cache_dir else None
+    _worker_data['fingerprint'] = fingerprint
+    _worker_data['indicators'] = model.IndicatorCache(data)
+
+def _evaluate_point(params):
+    """Evaluate the objective inside a pool worker"""
+    return objective(params, _worker_data['data'], _worker_data['cache'],
+                     _worker_data['fingerprint'], _worker_data['indicators'])
+
+def optimize_parameters_batched(data=None, n_calls=50, batch_size=8, workers=None,
+                                n_initial_points=10, cache_dir=None, random_state=None):
+    """
+    Run batched Bayesian optimization with parallel evaluations
+    
+    Each iteration asks the optimizer for batch_size points using the
+    constant-liar strategy and evaluates them concurrently on a process pool.
+    Every worker receives the dataset once, when it starts. Workers share the
+    on-disk result cache in cache_dir; each keeps its own in-memory cache.
+    
+    Args:
+        data: Price data shared by every evaluation; loaded with load_data() when None
+        n_calls: Total number of evaluations
+        batch_size: Number of points evaluated concurrently per iteration
+        workers: Number of worker processes (defaults to batch_size)
+        n_initial_points: Number of random explorations before fitting the model
+        cache_dir: Directory of the on-disk result cache, or None to disable caching
+        random_state: Seed for the optimizer
+    """
+    if data is None:
+        data = load_data()
+    if data is None:
+        print("No data available for optimization")
+        return None, None
+    
+    from skopt import Optimizer
+    from skopt.utils import cook_estimator
+    
+    space = parameter_space()
+    optimizer = Optimizer(
+        space,
+        base_estimator=cook_estimator("GP", space=space, noise=0.1),
+        n_initial_points=n_initial_points,
+        acq_func="gp_hedge",
+        random_state=random_state
+    )
+    fingerprint = result_cache.data_fingerprint(data) if cache_dir else None
+    
+    print(f"Starting batched parameter optimization ({batch_size} points per batch)...")
+    start_time = time.perf_counter()
+    evaluated = 0
+    with ProcessPoolExecutor(max_workers=workers or batch_size, initializer=_init_objective_worker,
+                             initargs=(data, cache_dir, fingerprint)) as executor:
+        while evaluated < n_calls:
+            points = optimizer.ask(n_points=min(batch_size, n_calls - evaluated), strategy="cl_min")
+            scores = list(executor.map(_evaluate_point, points))
+            result = optimizer.tell(points, scores)
+            evaluated += len(points)
+            
+            elapsed = time.perf_counter() - start_time
+            print(f"Evaluated {evaluated}/{n_calls} points, best Sharpe {-result.fun:.4f}, "
+                  f"{evaluated / elapsed:.2f} evaluations/s")
+    
+    elapsed = time.perf_counter() - start_time
+    print(f"Throughput: {evaluated / elapsed:.2f} evaluations/s over {elapsed:.1f}s")
+    
+    # Extract optimal parameters
+    best_params = result.x
+    best_score = -result.fun  # Convert back to positive Sharpe ratio
+    print_results(best_params, best_score)
     
     return best_params, best_score
 
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Optimize strategy parameters")
+    parser.add_argument('--data', help="Frozen dataset snapshot (.csv, .parquet, .pkl or .npz) to optimize on")
+    parser.add_argument('--save-data', help="Save the loaded dataset to this snapshot file")
+    parser.add_argument('--start-date', default=OPTIMIZATION_START_DATE,
+                        help="Start date when downloading data")
+    parser.add_argument('--n-calls', type=int, default=50, help="Total number of evaluations")
+    parser.add_argument('--n-random-starts', type=int, default=10,
+                        help="Number of random explorations")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help="Points evaluated concurrently per iteration (1 runs serial gp_minimize)")
+    parser.add_argument('--workers', type=int, help="Worker processes for batched optimization")
+    parser.add_argument('--cache-dir', default=result_cache.DEFAULT_CACHE_DIR,
+                        help="Directory of the on-disk result cache")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the result cache")
+    parser.add_argument('--seed', type=int, help="Random seed, so an interrupted run can be resumed")
+    parser.add_argument('--profile', metavar='REPORT', nargs='?', const='',
+                        help="Record stage timings and print them (and write them as JSON to REPORT)")
+    parser.add_argument('--profile-dir', help="Write a cProfile dump per stage to this directory")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    optimize_parameters()
+    args = parse_args()
+    if args.profile is not None or args.profile_dir:
+        profiling.enable(args.profile_dir)
+    data = load_data(args.data, args.start_date)
+    if data is not None and args.save_data:
+        model.save_dataset(data, args.save_data)
+        print(f"Dataset saved to {args.save_data}")
+    cache_dir = None if args.no_cache else args.cache_dir
+    if args.batch_size > 1:
+        optimize_parameters_batched(data, n_calls=args.n_calls, batch_size=args.batch_size,
+                                    workers=args.workers, n_initial_points=args.n_random_starts,
+                                    cache_dir=cache_dir, random_state=args.seed)
+    else:
+        cache = result_cache.ResultCache(cache_dir) if cache_dir else None
+        optimize_parameters(data, n_calls=args.n_calls, n_random_starts=args.n_random_starts,
+                            cache=cache, random_state=args.seed)
+    profiling.emit_report(args.profile or None)
@@ -0,0 +1,128 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# ----------------- Panel Parameters -----------------
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()  # Ordinal of day 0 of datetime64[D]
+
+
+def _to_ordinals(index):
+    """Convert a date-like index to int32 proleptic Gregorian ordinals"""
+    days = pd.to_datetime(pd.Index(index)).to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return (days + _EPOCH_ORDINAL).astype(np.int32)
+
+
+class PricePanel:
+    """
+    Compact columnar store of daily prices.
+
+    Prices live in one C-contiguous (days x tickers) matrix of float64 or
+    float32, dates as int32 day ordinals (date.toordinal()) and tickers in a
+    ticker -> column map, so every access is positional: no hashing of date
+    objects and no per-column pandas overhead. A float32 panel halves the
+    memory of the equivalent float64 DataFrame; float64 panels round-trip
+    exactly through from_frame/to_frame.
+    """
+
+    def __init__(self, values, days, tickers, dtype=np.float64):
+        self.values = np.ascontiguousarray(values, dtype=dtype)
+        self.days = np.ascontiguousarray(days, dtype=np.int32)
+        self.tickers = list(tickers)
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        if self.values.ndim != 2 or self.values.shape != (len(self.days), len(self.tickers)):
+            raise ValueError(f"Price matrix of shape {self.values.shape} does not match "
+                             f"{len(self.days)} days and {len(self.tickers)} tickers")
+        if len(self.columns) != len(self.tickers):
+            raise ValueError("Duplicate tickers in price panel")
+        if len(self.days) > 1 and not (np.diff(self.days) > 0).all():
+            raise ValueError("Price panel days must be strictly increasing")
+
+    @classmethod
+    def from_frame(cls, data, dtype=np.float64):
+        """
+        Build a panel from a price DataFrame
+
+        Args:
+            data: DataFrame indexed by date with one column per ticker, as
+                  returned by model.download_data
+            dtype: np.float64 (exact) or np.float32 (half the memory)
+
+        Returns:
+            PricePanel
+        """
+        return cls(data.to_numpy(dtype=dtype), _to_ordinals(data.index), data.columns, dtype)
+
+    def to_frame(self, dtype=np.float64):
+        """
+        Convert back to the DataFrame layout of model.download_data
+
+        Returns:
+            DataFrame indexed by datetime.date with one column per ticker
+        """
+        return pd.DataFrame(self.values.astype(dtype), index=self.dates, columns=self.tickers)
+
+    @property
+    def dates(self):
+        """List of datetime.date, one per row"""
+        return [date.fromordinal(day) for day in self.days.tolist()]
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        """Bytes held by the price matrix and the day ordinals"""
+        return self.values.nbytes + self.days.nbytes
+
+    def __len__(self):
+        return len(self.days)
+
+    def column(self, ticker):
+        """Return the prices of one ticker as a view"""
+        return self.values[:, self.columns[ticker]]
+
+    def price(self, row, ticker):
+        """Return the price of a ticker on the row-th day"""
+        return self.values[row, self.columns[ticker]]
+
+    def row_of(self, day):
+        """
+        Return the row number of a date
+
+        Args:
+            day: date, datetime, string or ordinal
+
+        Returns:
+            Row index
+
+        Raises:
+            KeyError: If the date is not in the panel
+        """
+        ordinal = day if isinstance(day, (int, np.integer)) else pd.Timestamp(day).toordinal()
+        row = int(np.searchsorted(self.days, ordinal))
+        if row == len(self.days) or self.days[row] != ordinal:
+            raise KeyError(day)
+        return row
+
+    def select(self, tickers):
+        """Return a panel with a subset of the tickers, in the given order"""
+        index = [self.columns[ticker] for ticker in tickers]
+        return PricePanel(self.values[:, index], self.days, tickers, self.values.dtype)
+
+    def slice(self, start, end):
+        """Return the rows [start, end) as a panel sharing memory with this one"""
+        return PricePanel(self.values[start:end], self.days[start:end], self.tickers, self.values.dtype)
+
+    def save(self, path):
+        """Write the panel to an uncompressed .npz file"""
+        np.savez(path, values=self.values, days=self.days, tickers=np.array(self.tickers, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        """Read a panel written by save()"""
+        with np.load(path) as archive:
+            values = archive['values']
+            return cls(values, archive['days'], archive['tickers'].tolist(), values.dtype)
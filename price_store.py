@@ -0,0 +1,167 @@
+import os
+import sqlite3
+from datetime import date
+
+import pandas as pd
+
+# ----------------- Store Parameters -----------------
+# Location of the local price store; override with PRICE_STORE_PATH
+DEFAULT_STORE_PATH = os.getenv('PRICE_STORE_PATH', os.path.join('data', 'prices.sqlite'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close REAL NOT NULL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT PRIMARY KEY,
+    start TEXT NOT NULL,
+    last TEXT,
+    checked TEXT
+);
+"""
+
+
+def _to_iso(value):
+    """Convert a date, datetime or date string to an ISO date string"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:10]
+    return pd.Timestamp(value).date().isoformat()
+
+
+class PriceStore:
+    """
+    Persistent close-price store keyed by ticker and date.
+
+    Prices live in a single SQLite file. Alongside the bars, the store keeps a
+    coverage record per ticker: the earliest start date that was requested,
+    the last stored bar and the end date the ticker was last checked against.
+    ``download_data`` uses the coverage record to fetch only the bars after
+    the last stored date.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def tickers(self):
+        """Return the tickers that have a coverage record"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT ticker FROM coverage ORDER BY ticker").fetchall()
+        return [row[0] for row in rows]
+
+    def coverage(self, ticker):
+        """
+        Return the coverage record for a ticker
+
+        Args:
+            ticker: Ticker symbol
+
+        Returns:
+            Dictionary with 'start', 'last' and 'checked' ISO date strings,
+            or None if the ticker has never been stored
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT start, last, checked FROM coverage WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'start': row[0], 'last': row[1], 'checked': row[2]}
+
+    def read(self, ticker, start_date=None, end_date=None):
+        """
+        Read stored close prices for a ticker
+
+        Args:
+            ticker: Ticker symbol
+            start_date: First date to return (inclusive), or None for all history
+            end_date: Last date to return (exclusive), or None for all history
+
+        Returns:
+            Series of close prices indexed by datetime.date
+        """
+        query = "SELECT date, close FROM prices WHERE ticker = ?"
+        params = [ticker]
+        if start_date is not None:
+            query += " AND date >= ?"
+            params.append(_to_iso(start_date))
+        if end_date is not None:
+            query += " AND date < ?"
+            params.append(_to_iso(end_date))
+        query += " ORDER BY date"
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        index = [date.fromisoformat(row[0]) for row in rows]
+        values = [row[1] for row in rows]
+        return pd.Series(values, index=index, dtype=float, name=ticker)
+
+    def write(self, ticker, prices, start_date=None, checked=None, replace=False):
+        """
+        Merge close prices for a ticker into the store
+
+        Args:
+            ticker: Ticker symbol
+            prices: Series of close prices indexed by date; may be empty to only
+                    record that a covered ticker was checked up to a new end date
+            start_date: Start date the prices were requested from; widens the
+                coverage record when earlier than the stored start
+            checked: End date the ticker was fetched up to
+            replace: Drop all stored bars for the ticker before writing
+        """
+        prices = prices.dropna()
+        rows = [(ticker, _to_iso(day), float(value)) for day, value in prices.items()]
+
+        with self._connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM prices WHERE ticker = ?", (ticker,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO prices (ticker, date, close) VALUES (?, ?, ?)", rows
+            )
+            last = conn.execute(
+                "SELECT MAX(date) FROM prices WHERE ticker = ?", (ticker,)
+            ).fetchone()[0]
+
+            current = conn.execute(
+                "SELECT start, checked FROM coverage WHERE ticker = ?", (ticker,)
+            ).fetchone()
+            start = _to_iso(start_date) or (rows[0][1] if rows else None)
+            checked = _to_iso(checked)
+            if current is not None and not replace:
+                if start is None or current[0] < start:
+                    start = current[0]
+                if current[1] is not None and (checked is None or current[1] > checked):
+                    checked = current[1]
+            if start is None:
+                return
+
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage (ticker, start, last, checked) VALUES (?, ?, ?, ?)",
+                (ticker, start, last, checked)
+            )
+
+    def import_frame(self, data, start_date=None):
+        """
+        Seed the store from a DataFrame of close prices (one column per ticker)
+
+        Args:
+            data: DataFrame indexed by date, e.g. the output of download_data
+            start_date: Start date to record as covered; defaults to the first row
+        """
+        for column in data.columns:
+            ticker = '^VIX' if column == 'VIX' else column
+            self.write(ticker, data[column], start_date=start_date or data.index[0],
+                       checked=None, replace=True)
@@ -0,0 +1,282 @@
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# ----------------- Profiling Parameters -----------------
+ENABLED = os.getenv('PROFILE_STAGES', '') == '1'  # Record stage timings and counters process-wide
+PROFILE_DIR = os.getenv('PROFILE_DIR') or None  # Directory for per-stage cProfile dumps (None disables)
+REPORT_PATH = os.getenv('PROFILE_REPORT') or None  # JSON file written by emit_report
+
+
+class Collector:
+    """
+    Stage timings and counters of one run
+
+    collect() gives every run (one optimizer process, one dashboard session
+    run) its own collector, so concurrent runs never mix or reset each
+    other's timings. The process-wide collector used when ENABLED is set is
+    a Collector as well.
+    """
+
+    def __init__(self, profile_dir=None):
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._dumps = 0
+
+    def reset(self):
+        """Drop all recorded timings and counters"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._dumps = 0
+
+    def record(self, name, elapsed):
+        """Add one timed call of a stage"""
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry is None:
+                self._stages[name] = {'calls': 1, 'total': elapsed, 'min': elapsed, 'max': elapsed}
+            else:
+                entry['calls'] += 1
+                entry['total'] += elapsed
+                entry['min'] = min(entry['min'], elapsed)
+                entry['max'] = max(entry['max'], elapsed)
+
+    def count(self, name, amount=1):
+        """Add to a named counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def dump_path(self, name):
+        """Return a numbered .prof path in profile_dir for a stage"""
+        with self._lock:
+            self._dumps += 1
+            number = self._dumps
+        return os.path.join(self.profile_dir, f"{number:04d}-{name}.prof")
+
+    def report(self):
+        """
+        Return the recorded timings and counters
+
+        Returns:
+            Dictionary with a timestamp, per-stage call counts and total, mean,
+            min and max seconds, and the counters
+        """
+        with self._lock:
+            stages = {
+                name: {
+                    'calls': entry['calls'],
+                    'total_seconds': entry['total'],
+                    'mean_seconds': entry['total'] / entry['calls'],
+                    'min_seconds': entry['min'],
+                    'max_seconds': entry['max'],
+                }
+                for name, entry in self._stages.items()
+            }
+            counters = dict(self._counters)
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'stages': stages,
+            'counters': counters,
+        }
+
+    def report_frame(self):
+        """Return the stage timings as a DataFrame sorted by total time"""
+        frame = pd.DataFrame.from_dict(self.report()['stages'], orient='index',
+                                       columns=['calls', 'total_seconds', 'mean_seconds',
+                                                'min_seconds', 'max_seconds'])
+        frame.index.name = 'stage'
+        return frame.sort_values('total_seconds', ascending=False)
+
+    def write_report(self, path):
+        """Write the report as JSON"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+_default = Collector(PROFILE_DIR)  # Process-wide collector, active while ENABLED
+_current = contextvars.ContextVar('profiling_collector', default=None)
+_depth = contextvars.ContextVar('profiling_depth', default=0)
+
+
+def _active():
+    """Return the collector of the current context, or None when nothing is recorded"""
+    collector = _current.get()
+    if collector is None and ENABLED:
+        return _default
+    return collector
+
+
+@contextmanager
+def collect(profile_dir=None):
+    """
+    Record the stages of a block into a fresh Collector
+
+    Only code running in this context sees the collector: other threads
+    and Streamlit sessions are unaffected, whatever the value of ENABLED.
+    Work submitted to a thread pool is recorded when it runs in a copy of
+    the context (contextvars.copy_context().run).
+
+    Args:
+        profile_dir: Also write a cProfile dump of every outermost stage run
+                     on the main thread to this directory
+
+    Yields:
+        Collector
+    """
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    collector = Collector(profile_dir)
+    token = _current.set(collector)
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+
+
+def enable(profile_dir=None):
+    """
+    Start recording stage timings process-wide
+
+    Meant for command line runs; the dashboard records each run with collect().
+
+    Args:
+        profile_dir: Also write a cProfile dump of every outermost stage to this directory
+    """
+    global ENABLED, PROFILE_DIR
+    ENABLED = True
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        PROFILE_DIR = _default.profile_dir = profile_dir
+
+
+def disable():
+    """Stop process-wide recording; instrumented functions then run without timing"""
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    """Drop all timings and counters of the process-wide collector"""
+    _default.reset()
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block of code as a named stage
+
+    Timings are inclusive: a stage that calls other instrumented functions
+    includes their time. When the collector has a profile_dir, the
+    outermost stage is also run under cProfile and dumped to its own .prof
+    file; only the main thread is profiled, since one process cannot run
+    two profilers at once. Work done in worker processes is not recorded.
+
+    Args:
+        name: Stage name in the report
+    """
+    collector = _active()
+    if collector is None:
+        yield
+        return
+
+    depth = _depth.get()
+    profiler = None
+    if collector.profile_dir and depth == 0 and threading.current_thread() is threading.main_thread():
+        profiler = cProfile.Profile()
+    token = _depth.set(depth + 1)
+    if profiler is not None:
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(collector.dump_path(name))
+        _depth.reset(token)
+        collector.record(name, elapsed)
+
+
+def timed(name=None):
+    """
+    Decorator that records every call of a function as a stage
+
+    When nothing is being recorded the wrapper only checks one module flag
+    and one context variable before calling the function.
+
+    Args:
+        name: Stage name (defaults to the function's qualified name)
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED and _current.get() is None:
+                return func(*args, **kwargs)
+            with stage(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1):
+    """Add to a named counter (no-op when nothing is being recorded)"""
+    collector = _active()
+    if collector is not None:
+        collector.count(name, amount)
+
+
+def report(collector=None):
+    """Return the report of a collector (defaults to the active or process-wide one)"""
+    return (collector or _active() or _default).report()
+
+
+def report_frame(collector=None):
+    """Return the stage timings of a collector as a DataFrame sorted by total time"""
+    return (collector or _active() or _default).report_frame()
+
+
+def write_report(path, collector=None):
+    """Write the report of a collector as JSON"""
+    (collector or _active() or _default).write_report(path)
+
+
+def emit_report(path=None, collector=None):
+    """
+    Print the report as one log line per stage and counter, and write it as
+    JSON to path (defaults to REPORT_PATH) when one is set
+
+    Args:
+        path: JSON file to write
+        collector: Collector to report (defaults to the active one; nothing
+                   is printed when no collector is active)
+    """
+    collector = collector or _active()
+    if collector is None:
+        return
+    data = collector.report()
+    for name, entry in sorted(data['stages'].items(), key=lambda item: -item[1]['total_seconds']):
+        print(f"[profile] stage={name} calls={entry['calls']} total={entry['total_seconds']:.4f}s "
+              f"mean={entry['mean_seconds']:.4f}s max={entry['max_seconds']:.4f}s")
+    for name, value in sorted(data['counters'].items()):
+        print(f"[profile] counter={name} value={value}")
+    path = path or REPORT_PATH
+    if path:
+        collector.write_report(path)
+        print(f"[profile] report written to {path}")
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from dataclasses import astuple
+
+import numpy as np
+import pandas as pd
+
+import model
+import profiling
+
+# ----------------- Cache Parameters -----------------
+# Directory of the on-disk result cache; override with RESULT_CACHE_DIR
+DEFAULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join('data', 'result_cache'))
+MAX_MEMORY_ENTRIES = 256  # Results kept in memory
+MAX_DISK_ENTRIES = 10000  # Result files kept on disk
+CACHE_VERSION = 3  # Part of every key; bump when the backtest engine or the results layout changes
+
+
+def data_fingerprint(data):
+    """
+    Hash a price DataFrame's columns, dates and values
+
+    Args:
+        data: DataFrame with price data
+
+    Returns:
+        Hex digest identifying the dataset
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(list(data.columns)).encode())
+    digest.update(np.array([pd.Timestamp(day).toordinal() for day in data.index], dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(data.to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+def result_key(config, fingerprint, **options):
+    """
+    Build the cache key for one rolling_backtest evaluation
+
+    The key includes CACHE_VERSION, so entries written by an older engine
+    are never served after the trading rules change.
+
+    Args:
+        config: StrategyConfig of the run
+        fingerprint: data_fingerprint of the price data
+        **options: Other rolling_backtest keyword arguments that change the
+                   results; values must be None, bool, int, float or str, since
+                   the repr of an array or DataFrame is truncated
+
+    Returns:
+        Hex digest key
+    """
+    for name, value in options.items():
+        if value is not None and not isinstance(value, (bool, int, float, str)):
+            raise ValueError(f"Cache key option {name} must be a scalar, got {type(value).__name__}")
+    payload = repr((CACHE_VERSION, fingerprint, astuple(config), sorted(options.items())))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-level LRU cache for rolling_backtest results.
+
+    Results are kept in an in-memory LRU and, when a directory is given, in
+    one pickle file per key on disk. Disk entries are ordered by modification
+    time, which is refreshed on every hit, and the least recently used files
+    are removed beyond max_disk_entries. The disk cache survives restarts, so
+    an interrupted optimization resumes without recomputing earlier points.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_memory_entries=MAX_MEMORY_ENTRIES,
+                 max_disk_entries=MAX_DISK_ENTRIES):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        """Return the cached results for a key, or None"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self._touch(key)
+            self.hits += 1
+            return self._memory[key].copy()
+
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    results = pickle.load(f)
+                os.utime(path)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                results = None
+            if results is not None:
+                self._remember(key, results)
+                self.hits += 1
+                return results.copy()
+
+        self.misses += 1
+        return None
+
+    def put(self, key, results):
+        """Store results for a key in memory and on disk"""
+        self._remember(key, results)
+        if not self.directory:
+            return
+
+        # Write to a temporary file first so concurrent readers never see a partial pickle
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self._evict_disk()
+
+    def _touch(self, key):
+        """Mark a disk entry as recently used"""
+        if self.directory:
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+
+    def _remember(self, key, results):
+        self._memory[key] = results
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.pkl')]
+        if len(entries) <= self.max_disk_entries:
+            return
+        # Other processes evict from the same directory; skip files they already removed
+        mtimes = []
+        for entry in entries:
+            try:
+                mtimes.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                pass
+        excess = len(mtimes) - self.max_disk_entries
+        if excess <= 0:
+            return
+        mtimes.sort()
+        for _, path in mtimes[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def cached_rolling_backtest(data, config=None, cache=None, fingerprint=None, **options):
+    """
+    Run model.rolling_backtest, reusing cached results for the same config and data
+
+    Args:
+        data: DataFrame with price data
+        config: StrategyConfig (defaults to the module-level parameters)
+        cache: ResultCache to use; runs uncached when None
+        fingerprint: Precomputed data_fingerprint(data), to avoid hashing the data on every call
+        **options: Additional rolling_backtest keyword arguments. Runs of
+                   independent windows with and without indicators are cached
+                   separately, since their results can differ in the last bits.
+
+    Returns:
+        DataFrame of rolling window results
+    """
+    config = config or model.StrategyConfig.from_globals()
+    if cache is None:
+        return model.rolling_backtest(data, config=config, **options)
+
+    # The worker count and a precomputed portfolio of data and config do not change the
+    # results. Independent windows built from an IndicatorCache match per-window signals
+    # only up to floating-point rounding, so they get their own entries; a single pass is
+    # identical either way.
+    key_options = {name: value for name, value in options.items()
+                   if name not in ('workers', 'indicators', 'portfolio')}
+    if options.get('indicators') is not None and not options.get('single_pass'):
+        key_options['indicator_signals'] = True
+    key = result_key(config, fingerprint or data_fingerprint(data), **key_options)
+    results = cache.get(key)
+    if results is None:
+        profiling.count('result_cache_misses')
+        results = model.rolling_backtest(data, config=config, **options)
+        cache.put(key, results)
+    else:
+        profiling.count('result_cache_hits')
+    return results
@@ -0,0 +1,313 @@
+import argparse
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import model
+import price_panel
+import profiling
+import sweep
+
+# ----------------- Robustness Parameters -----------------
+N_PATHS = 1000  # Resampled paths per run
+BLOCK_SIZE = 63  # Mean block length in days (about a quarter), so momentum survives within blocks
+MEMORY_BUDGET = 2 ** 30  # Bytes of path arrays alive at once across all workers
+PATH_ARRAYS = 12  # Float arrays of days x columns alive per path while a chunk is simulated
+METHODS = ('block', 'regime')
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def vix_regimes(vix, config=None):
+    """
+    Label every day with the VIX regime the strategy trades in
+
+    Returns:
+        Integer array: 0 below the VIX high threshold, 1 above it and 2 above
+        the VIX extreme threshold
+    """
+    config = config or model.StrategyConfig.from_globals()
+    vix = np.asarray(vix, dtype=float)
+    return (vix > config.vix_high_threshold).astype(np.int64) + (vix > config.vix_extreme_threshold)
+
+
+def resample_days(n_days, seeds, block_size=BLOCK_SIZE, regimes=None):
+    """
+    Draw the historical source day of every day of every path
+
+    Paths follow a stationary block bootstrap: day 0 is the first day of the
+    history, and every later day either continues the current block with the
+    next historical day or, with probability 1 / block_size and always at the
+    end of the history, starts a new block at a random day. With regimes, a
+    new block starts at a random day of the regime that followed the previous
+    day in history, so the sequence of regimes keeps its historical
+    transition dynamics.
+
+    Args:
+        n_days: Days of history, and of every path
+        seeds: One seed (int or np.random.SeedSequence) per path; a path
+               depends only on its own seed
+        block_size: Mean block length in days
+        regimes: Optional integer regime label of every historical day
+
+    Returns:
+        Integer array (paths x days) of row indices into the history
+    """
+    n_paths = len(seeds)
+    sources = np.zeros((n_paths, n_days), dtype=np.int64)
+    if n_days < 2 or n_paths == 0:
+        return sources
+
+    draws = np.stack([np.random.default_rng(seed).random((2, n_days)) for seed in seeds])
+    restart = draws[:, 0] < 1 / block_size
+    uniform = draws[:, 1]
+
+    if regimes is not None:
+        # Days 1.. grouped by regime: pool of regime r is order[offsets[r]:offsets[r] + counts[r]]
+        labels = np.asarray(regimes)[1:]
+        order = np.argsort(labels, kind='stable') + 1
+        counts = np.bincount(labels)
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        regimes = np.asarray(regimes)
+
+    current = np.zeros(n_paths, dtype=np.int64)
+    for t in range(1, n_days):
+        following = current + 1
+        new_block = restart[:, t] | (following >= n_days)
+        if regimes is None:
+            start = 1 + (uniform[:, t] * (n_days - 1)).astype(np.int64)
+        else:
+            regime = regimes[np.minimum(following, n_days - 1)]
+            start = order[offsets[regime] + (uniform[:, t] * counts[regime]).astype(np.int64)]
+        current = np.where(new_block, start, following)
+        sources[:, t] = current
+    return sources
+
+
+def resample_prices(prices, sources, level_columns=()):
+    """
+    Build price paths from source days
+
+    Every path starts at the first historical prices and compounds the daily
+    returns of its source days. Columns in level_columns (VIX) are levels
+    rather than prices and are copied from the source days directly.
+
+    Args:
+        prices: Historical prices (days x columns)
+        sources: Source day indices (paths x days) from resample_days
+        level_columns: Column indices taken as levels
+
+    Returns:
+        Array of price paths (paths x days x columns)
+    """
+    gross = np.ones_like(prices)
+    gross[1:] = prices[1:] / prices[:-1]
+    paths = prices[0] * np.cumprod(gross[sources], axis=1)
+    for col in level_columns:
+        paths[:, :, col] = prices[sources, col]
+    return paths
+
+
+def simulate_paths(paths, columns, config, tradable=None):
+    """
+    Run the strategy over many price paths as one batched array computation
+
+    Signals, the top-K plan and the VIX rules of generate_signals and
+    backtest are evaluated for all paths at once; sweep.simulate_batch runs
+    the trade loop with the path as the batch axis.
+
+    Args:
+        paths: Price paths (paths x days x columns), VIX included
+        columns: Column names of the last axis
+        config: StrategyConfig
+        tradable: Tradable tickers (see model.tradable_mask)
+
+    Returns:
+        2-D array of portfolio values (paths x days)
+    """
+    n_paths, n_days, n_columns = paths.shape
+    columns = list(columns)
+    mask = model.tradable_mask(columns, tradable)
+
+    # ma_energy_matrix runs down the day axis, so lay the paths' columns side by side
+    signals = np.zeros(paths.shape)
+    if mask.any():
+        stacked = paths[:, :, mask].transpose(1, 0, 2).reshape(n_days, -1)
+        energy = model.ma_energy_matrix(stacked, config.window)
+        signals[:, :, mask] = energy.reshape(n_days, n_paths, -1).transpose(1, 0, 2)
+
+    ranked_columns, ranked = model.rank_candidates(signals.reshape(-1, n_columns), config.top_k)
+    ranked_columns = ranked_columns.reshape(n_paths, n_days, -1)
+    ranked = ranked.reshape(n_paths, n_days, -1)
+
+    vix = paths[:, :, columns.index('VIX')][:, :, None]
+    selected = (ranked > config.base_threshold) & ~(vix > config.vix_extreme_threshold)
+    weight = model.allocation_weights(ranked, selected, config.weighting) \
+        * np.where(vix > config.vix_high_threshold, 0.5, 1.0)
+    best = np.where(selected, ranked_columns, -1)
+
+    return sweep.simulate_batch(paths, best, weight, config.min_history, config.initial_capital)
+
+
+def chunk_size_for(n_days, n_columns, workers=None, memory_budget=MEMORY_BUDGET):
+    """
+    Number of paths to simulate together within a memory budget
+
+    A chunk holds about PATH_ARRAYS float arrays of days x columns per path,
+    and every worker process simulates its own chunk, so the budget is
+    shared by the workers.
+
+    Args:
+        n_days: Days of every path
+        n_columns: Price columns, VIX included
+        workers: Number of worker processes (None runs in-process)
+        memory_budget: Bytes available for the chunks of all workers
+
+    Returns:
+        Paths per chunk, at least 1
+    """
+    path_bytes = PATH_ARRAYS * n_days * n_columns * np.dtype(float).itemsize
+    return max(1, int(memory_budget // (max(workers or 1, 1) * path_bytes)))
+
+
+def _simulate_chunk(prices, columns, config, tradable, method, block_size, seeds):
+    """Resample and backtest one chunk of paths; returns the metric arrays of the chunk"""
+    vix_index = columns.index('VIX')
+    regimes = vix_regimes(prices[:, vix_index], config) if method == 'regime' else None
+    sources = resample_days(len(prices), seeds, block_size, regimes)
+    paths = resample_prices(prices, sources, level_columns=[vix_index])
+
+    chunk = metrics.compute_metrics(simulate_paths(paths, columns, config, tradable))
+    if 'SPY' in columns:
+        spy = metrics.compute_metrics(paths[:, :, columns.index('SPY')])
+        chunk.update({f'spy_{name}': spy[name] for name in metrics.METRIC_NAMES})
+    return chunk
+
+
+_worker_state = {}
+
+
+def _init_worker(path, columns, config, tradable, method, block_size):
+    """Attach a pool worker to the memory-mapped price matrix, shared by every chunk it runs"""
+    _worker_state['prices'] = np.load(path, mmap_mode='r')
+    _worker_state['args'] = (columns, config, tradable, method, block_size)
+
+
+def _run_chunk(seeds):
+    """Evaluate one chunk of paths inside a pool worker"""
+    return _simulate_chunk(_worker_state['prices'], *_worker_state['args'], seeds)
+
+
+@profiling.timed()
+def run_robustness(data, n_paths=N_PATHS, method='block', block_size=BLOCK_SIZE, config=None,
+                   tradable=None, seed=0, chunk_size=None, workers=None,
+                   memory_budget=MEMORY_BUDGET):
+    """
+    Backtest the strategy on many resampled histories
+
+    Every path is as long as the history and is built by the block bootstrap
+    of resample_days ('block') or its regime-matched variant ('regime', with
+    regimes from vix_regimes). Each path has its own seed, so the results
+    do not depend on chunk_size or workers.
+
+    Args:
+        data: DataFrame with price data, as returned by model.download_data,
+              or a price_panel.PricePanel; prices must not be missing
+        n_paths: Number of resampled paths
+        method: 'block' or 'regime'
+        block_size: Mean block length in days
+        config: StrategyConfig (defaults to the module-level parameters)
+        tradable: Tradable tickers (see model.tradable_mask)
+        seed: Seed of the whole run
+        chunk_size: Paths simulated together (defaults to chunk_size_for the
+                    data, workers and memory_budget)
+        workers: Number of worker processes (None or 1 runs in-process)
+        memory_budget: Bytes of path arrays alive at once across all workers
+
+    Returns:
+        DataFrame with one row per path and a column per metric in
+        metrics.METRIC_NAMES, plus the same metrics of SPY prefixed 'spy_'
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown resampling method: {method} (expected one of {METHODS})")
+    config = config or model.StrategyConfig.from_globals()
+    if isinstance(data, price_panel.PricePanel):
+        prices, columns = data.values.astype(float), list(data.tickers)
+    else:
+        prices, columns = data.to_numpy(dtype=float), list(data.columns)
+    if np.isnan(prices).any():
+        raise ValueError("Price data has missing values; drop or fill them before resampling")
+
+    chunk_size = chunk_size or chunk_size_for(len(prices), len(columns), workers, memory_budget)
+    seeds = np.random.SeedSequence(seed).spawn(n_paths)
+    chunks = [seeds[start:start + chunk_size] for start in range(0, n_paths, chunk_size)]
+
+    if workers and workers > 1 and len(chunks) > 1:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'prices.npy')
+            np.save(path, prices)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(path, columns, config, tradable, method,
+                                               block_size)) as executor:
+                results = list(executor.map(_run_chunk, chunks))
+    else:
+        results = [_simulate_chunk(prices, columns, config, tradable, method, block_size, chunk)
+                   for chunk in chunks]
+
+    if not results:
+        return pd.DataFrame(columns=list(metrics.METRIC_NAMES))
+    return pd.DataFrame({name: np.concatenate([chunk[name] for chunk in results])
+                         for name in results[0]})
+
+
+def summarize(results, quantiles=QUANTILES):
+    """
+    Summarize the metric distributions of run_robustness
+
+    Returns:
+        DataFrame with one row per metric and its mean, standard deviation
+        and quantiles
+    """
+    summary = results.quantile(list(quantiles)).T
+    summary.columns = [f'q{quantile:g}' for quantile in quantiles]
+    summary.insert(0, 'std', results.std())
+    summary.insert(0, 'mean', results.mean())
+    return summary
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Backtest the strategy on resampled price histories")
+    parser.add_argument('--data', help="Frozen dataset snapshot to resample (downloads when omitted)")
+    parser.add_argument('--start-date', default=model.START_DATE, help="Start date of downloaded data")
+    parser.add_argument('--paths', type=int, default=N_PATHS, help="Number of resampled paths")
+    parser.add_argument('--method', choices=METHODS, default='block', help="Resampling method")
+    parser.add_argument('--block-size', type=float, default=BLOCK_SIZE, help="Mean block length in days")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the run")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--memory-mb', type=int, default=MEMORY_BUDGET // 2 ** 20,
+                        help="Memory budget for the path arrays of all workers, in MB")
+    parser.add_argument('--output', help="CSV file for the per-path metrics")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.data:
+        data = model.load_dataset(args.data)
+    else:
+        data = model.download_data(start_date=args.start_date)
+    if data is None:
+        raise SystemExit("No data available")
+    data = data.dropna()
+
+    print(f"Backtesting {args.paths} {args.method}-resampled paths of {len(data)} days...")
+    results = run_robustness(data, args.paths, args.method, args.block_size, seed=args.seed,
+                             workers=args.workers, memory_budget=args.memory_mb * 2 ** 20)
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Per-path metrics saved to {args.output}")
+    print(summarize(results).to_string(float_format=lambda value: f"{value:.4f}"))
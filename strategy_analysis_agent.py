@@ -1,7 +1,24 @@
+import contextvars
+import hashlib
 import os
-import google.generativeai as genai
+import queue
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from datetime import datetime
 import pandas as pd
+import profiling
+
+# ----------------- Agent Parameters -----------------
+MODEL_NAME = "gemini-pro"
+MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Parallel LLM calls
+REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))  # Shared request rate limit
+# Directory of the persistent response cache; override with LLM_CACHE_DIR
+RESPONSE_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join("data", "llm_cache"))
+USE_STUB_MODEL = os.getenv("LLM_STUB", "") == "1"  # Answer with StubModel instead of Gemini
 
 def _get_google_api_key():
     """Return the configured Gemini API key, if one is available."""
@@ -22,38 +39,171 @@ safety_settings = [
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
 ]
 
-def _build_model():
-    api_key = _get_google_api_key()
-    if not api_key:
-        return None
+DISABLED_MESSAGE = (
+    "AI strategy review is disabled because no Gemini API key is configured. "
+    "Set GOOGLE_API_KEY or GEMINI_API_KEY in the runtime environment to enable this feature."
+)
 
+def _build_model(api_key):
+    # The Gemini SDK is slow to import; load it only when a client is actually needed
+    import google.generativeai as genai
+    
     genai.configure(api_key=api_key)
     return genai.GenerativeModel(
-        model_name="gemini-pro",
+        model_name=MODEL_NAME,
         generation_config=generation_config,
         safety_settings=safety_settings
     )
 
-def analyze_trading_window(window_data, vix_data):
+class StubModel:
     """
-    Analyze trading strategy performance and market conditions for a specific time window.
+    Offline stand-in for the Gemini client.
+    
+    Returns a short deterministic review built from the prompt's metric lines,
+    so the dashboard and tests run without network access or an API key.
+    Enable it with LLM_STUB=1 or pass an instance to analyze_all_windows.
+    """
+    
+    name = "stub"
+    
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls += 1
+        lines = [line.strip() for line in prompt.splitlines()]
+        period = next((line for line in lines if line.startswith("Analyze")), "")
+        metrics = [line for line in lines if re.match(r"- [\w ]+: -?[\d.]+%?$", line)]
+        text = "**Offline review (stub model)**\n\n" + period + "\n\n" + "\n".join(metrics)
+        if stream:
+            # Deliver the response line by line, like a streamed Gemini response
+            return iter([SimpleNamespace(text=line) for line in text.splitlines(keepends=True)])
+        return SimpleNamespace(text=text)
+
+_model_lock = threading.Lock()
+_shared_model = None
+_shared_model_key = None
+
+def get_model():
+    """
+    Return the shared LLM client
+    
+    The Gemini client is built once per API key and reused by every window
+    and thread. Returns a StubModel when LLM_STUB=1 and None when no API key
+    is configured.
+    """
+    global _shared_model, _shared_model_key
+    if USE_STUB_MODEL:
+        return StubModel()
+    
+    api_key = _get_google_api_key()
+    if not api_key:
+        return None
+    
+    with _model_lock:
+        if _shared_model is None or _shared_model_key != api_key:
+            _shared_model = _build_model(api_key)
+            _shared_model_key = api_key
+        return _shared_model
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces request starts evenly.
+    
+    A single limiter is shared by all threads (and dashboard sessions), so
+    the concurrency of analyze_all_windows never exceeds the provider quota.
+    """
+    
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+    
+    def wait(self):
+        """Block until the next request may start"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class ResponseCache:
+    """
+    Persistent cache of LLM responses keyed by a hash of model name and prompt.
+    
+    Each response is stored as a text file, written atomically, and kept in
+    memory after the first read. An unchanged window produces the same prompt
+    and is therefore never sent to the model twice.
+    """
+    
+    def __init__(self, directory=RESPONSE_CACHE_DIR):
+        self.directory = directory
+        self._memory = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    @staticmethod
+    def key(prompt, model_name=MODEL_NAME):
+        """Return the cache key of a prompt"""
+        return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".txt")
+    
+    def get(self, key):
+        """Return the cached response for a key, or None"""
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self._memory[key] = text
+        return text
+    
+    def put(self, key, text):
+        """Store a response in memory and on disk"""
+        with self._lock:
+            self._memory[key] = text
+        if not self.directory:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self._path(key))
+
+_cache_lock = threading.Lock()
+_default_cache = None
+_default_rate_limiter = RateLimiter()
+
+def _get_default_cache():
+    global _default_cache
+    with _cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+def build_prompt(window_data, vix_data):
+    """
+    Format the analysis prompt for one trading window
     
     Args:
         window_data (dict): Dictionary containing window performance metrics
         vix_data (pd.Series): VIX data for the window period
     
     Returns:
-        str: Structured analysis of strategy performance and market conditions
+        str: Prompt text
     """
-    model = _build_model()
-    if model is None:
-        return (
-            "AI strategy review is disabled because no Gemini API key is configured. "
-            "Set GOOGLE_API_KEY or GEMINI_API_KEY in the runtime environment to enable this feature."
-        )
-    
-    # Format the analysis prompt
-    prompt = f"""
+    return f"""
     Analyze the trading strategy performance for the period {window_data['Start Date']} to {window_data['End Date']}.
     
     Market Data:
@@ -95,38 +245,155 @@ def analyze_trading_window(window_data, vix_data):
     
     Keep the analysis focused on actionable insights for strategy enhancement.
     """
+
+def analyze_trading_window(window_data, vix_data, model=None, cache=None, rate_limiter=None,
+                           on_chunk=None):
+    """
+    Analyze trading strategy performance and market conditions for a specific time window.
+    
+    Args:
+        window_data (dict): Dictionary containing window performance metrics
+        vix_data (pd.Series): VIX data for the window period
+        model: LLM client with generate_content (defaults to the shared client)
+        cache (ResponseCache): Response cache; responses are not cached when None
+        rate_limiter (RateLimiter): Limiter to wait on before calling the model
+        on_chunk (callable): Called with each piece of text as the response
+            streams in; the request is made with stream=True when given
+    
+    Returns:
+        str: Structured analysis of strategy performance and market conditions
+    """
+    model = model or get_model()
+    if model is None:
+        return DISABLED_MESSAGE
+    
+    prompt = build_prompt(window_data, vix_data)
+    key = ResponseCache.key(prompt, getattr(model, "name", MODEL_NAME))
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            profiling.count('llm_cache_hits')
+            return cached
     
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        profiling.count('llm_requests')
+        with profiling.stage('llm_request'):
+            if on_chunk is None:
+                text = model.generate_content(prompt).text
+            else:
+                pieces = []
+                for chunk in model.generate_content(prompt, stream=True):
+                    pieces.append(chunk.text)
+                    on_chunk(chunk.text)
+                text = "".join(pieces)
     except Exception as e:
+        # Errors are not cached so the window is retried on the next run
         return f"Error generating analysis: {str(e)}"
+    
+    if cache is not None:
+        cache.put(key, text)
+    return text
 
-def analyze_all_windows(results_df, data):
+def _window_period(window):
+    return f"{window['Start Date'].strftime('%Y-%m-%d')} to {window['End Date'].strftime('%Y-%m-%d')}"
+
+def iter_window_analyses(results_df, data, model=None, cache=None, max_workers=MAX_CONCURRENT_REQUESTS,
+                         rate_limiter=None, stream=True):
     """
-    Analyze all trading windows in the backtest results.
+    Analyze all trading windows concurrently and yield progress as it arrives.
+    
+    Worker threads run the requests and push streamed text onto a queue; the
+    generator runs in the caller's thread, so a Streamlit script can update
+    its placeholders directly from the loop. Cached windows complete at once.
     
     Args:
         results_df (pd.DataFrame): DataFrame containing backtest results
         data (pd.DataFrame): Original price data including VIX
+        model: LLM client (defaults to the shared client)
+        cache (ResponseCache): Response cache (defaults to the on-disk cache in RESPONSE_CACHE_DIR);
+            pass False to request every window without caching
+        max_workers (int): Maximum number of concurrent requests
+        rate_limiter (RateLimiter): Request rate limiter (defaults to the module-wide limiter)
+        stream (bool): Request streamed responses and yield partial text
     
-    Returns:
-        list: List of analysis results for each window
+    Yields:
+        tuple: (position, period, text, done) where position is the window's
+        row number in results_df and text is the analysis received so far
     """
-    analyses = []
+    model = model or get_model()
+    if model is not None:
+        if cache is None:
+            cache = _get_default_cache()
+        elif cache is False:
+            cache = None
+        rate_limiter = rate_limiter or _default_rate_limiter
     
+    jobs = []
     for idx, window in results_df.iterrows():
         # Get VIX data for the window period
         window_vix = data.loc[window['Start Date']:window['End Date']]['VIX']
+        jobs.append((_window_period(window), window.to_dict(), window_vix))
+    if not jobs:
+        return
+    
+    events = queue.Queue()
+    
+    def analyze(position, window_dict, window_vix):
+        on_chunk = (lambda text: events.put((position, text, False))) if stream else None
+        try:
+            text = analyze_trading_window(window_dict, window_vix, model=model, cache=cache,
+                                          rate_limiter=rate_limiter, on_chunk=on_chunk)
+        except Exception as e:
+            text = f"Error generating analysis: {str(e)}"
+        events.put((position, text, True))
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers or 1, len(jobs))))
+    try:
+        for position, (_, window_dict, window_vix) in enumerate(jobs):
+            # Run in a copy of the caller's context so its profiling collector sees the requests
+            executor.submit(contextvars.copy_context().run, analyze, position, window_dict, window_vix)
         
-        # Convert window data to dict for analysis
-        window_dict = window.to_dict()
-        
-        # Get analysis for this window
-        analysis = analyze_trading_window(window_dict, window_vix)
-        analyses.append({
-            'period': f"{window['Start Date'].strftime('%Y-%m-%d')} to {window['End Date'].strftime('%Y-%m-%d')}",
-            'analysis': analysis
-        })
+        received = [""] * len(jobs)
+        remaining = len(jobs)
+        while remaining:
+            position, text, done = events.get()
+            if done:
+                # The final event carries the full text (or the error message)
+                received[position] = text
+                remaining -= 1
+            else:
+                received[position] += text
+            yield position, jobs[position][0], received[position], done
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+@profiling.timed()
+def analyze_all_windows(results_df, data, model=None, cache=None, max_workers=MAX_CONCURRENT_REQUESTS,
+                        rate_limiter=None):
+    """
+    Analyze all trading windows in the backtest results.
+    
+    Windows are analyzed concurrently on a bounded thread pool that shares one
+    client, one rate limiter and one response cache.
     
+    Args:
+        results_df (pd.DataFrame): DataFrame containing backtest results
+        data (pd.DataFrame): Original price data including VIX
+        model: LLM client (defaults to the shared client)
+        cache (ResponseCache): Response cache (defaults to the on-disk cache in RESPONSE_CACHE_DIR);
+            pass False to request every window without caching
+        max_workers (int): Maximum number of concurrent requests
+        rate_limiter (RateLimiter): Request rate limiter (defaults to the module-wide limiter)
+    
+    Returns:
+        list: List of analysis results for each window, in window order
+    """
+    analyses = [None] * len(results_df)
+    for position, period, text, done in iter_window_analyses(
+            results_df, data, model=model, cache=cache, max_workers=max_workers,
+            rate_limiter=rate_limiter, stream=False):
+        if done:
+            analyses[position] = {'period': period, 'analysis': text}
     return analyses
@@ -0,0 +1,148 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import model
+
+# ----------------- Sweep Parameters -----------------
+CHUNK_SIZE = 1000  # Configurations simulated together; bounds memory to chunk x days x top_k values
+
+
+def simulate_batch(prices, best, weight, min_history, initial_capital):
+    """
+    Run the backtest trade loop for many configurations or price paths at once
+
+    The state arrays (shares per ticker, cash) carry a leading batch axis and
+    each day is one vectorized update across the whole batch. The trading
+    rules are those of model.backtest: on a trade day each chosen ETF is
+    resized to its target weight of the current portfolio value; other
+    holdings are sold when there is more than one slot and left untouched
+    otherwise. Holdings are summed in column order rather than in the
+    order positions were opened, so values agree with model.backtest up to
+    floating-point rounding.
+
+    Args:
+        prices: Candidate prices, either shared by the batch (days x candidates)
+                or one path per batch row (batch x days x candidates)
+        best: Candidates to buy per batch row and day, -1 for no trade; either
+              (batch x days) or, for top-K allocation, (batch x days x slots)
+        weight: Target weights shaped like best
+        min_history: Days without trading at the start
+        initial_capital: Starting cash
+
+    Returns:
+        2-D array of portfolio values (batch x days)
+    """
+    shared = prices.ndim == 2
+    if best.ndim == 2:
+        best = best[:, :, None]
+        weight = weight[:, :, None]
+    rebalance = best.shape[2] > 1
+    n_batch, n_days = best.shape[:2]
+    n_candidates = prices.shape[-1]
+
+    values = np.full((n_batch, n_days), float(initial_capital))
+    shares = np.zeros((n_batch, n_candidates))
+    cash = np.full(n_batch, float(initial_capital))
+
+    for i in range(min_history, n_days):
+        row = prices[i] if shared else prices[:, i, :]
+        total_value = cash + (shares * row).sum(axis=1)
+        values[:, i] = total_value
+
+        trade = best[:, i] >= 0
+        if trade.any():
+            if rebalance:
+                shares[trade.any(axis=1)] = 0.0
+            batch_rows, slots = np.nonzero(trade)
+            cols = best[batch_rows, i, slots]
+            current_price = row[cols] if shared else row[batch_rows, cols]
+            shares[batch_rows, cols] = np.trunc(total_value[batch_rows] * weight[batch_rows, i, slots]
+                                                / current_price)
+
+        cash = total_value - (shares * row).sum(axis=1)
+
+    return values
+
+
+def parameter_grid(base_thresholds, vix_high_thresholds, vix_extreme_thresholds):
+    """
+    Build the full cartesian grid of sweep parameters
+
+    Returns:
+        DataFrame with one row per configuration
+    """
+    grid = list(itertools.product(base_thresholds, vix_high_thresholds, vix_extreme_thresholds))
+    return pd.DataFrame(grid, columns=['base_threshold', 'vix_high_threshold',
+                                       'vix_extreme_threshold'])
+
+
+def sweep_parameters(data, base_thresholds, vix_high_thresholds, vix_extreme_thresholds,
+                     config=None, indicators=None, window_years=None, chunk_size=CHUNK_SIZE):
+    """
+    Backtest every combination of signal threshold and VIX thresholds in one pass
+
+    Signals depend only on the MA window, so they are generated once. The
+    ranking of the top_k strongest ETFs of each day is shared by every
+    configuration; the threshold gate, weighting and VIX scaling of
+    get_target_weights become a (configs x days x top_k) array computation,
+    and simulate_batch runs the position updates for all configurations
+    together.
+
+    Args:
+        data: DataFrame with price data
+        base_thresholds: Values of the base signal threshold
+        vix_high_thresholds: Values of the VIX high threshold
+        vix_extreme_thresholds: Values of the VIX extreme threshold
+        config: StrategyConfig for the remaining parameters (defaults to the
+                module-level parameters)
+        indicators: Optional model.IndicatorCache for data
+        window_years: Also report the average Sharpe ratio over non-overlapping
+                      windows of this many years, evaluated as slices of each
+                      configuration's full-history path
+        chunk_size: Number of configurations simulated together
+
+    Returns:
+        DataFrame with the parameters and full-history metrics of every configuration
+    """
+    config = config or model.StrategyConfig.from_globals()
+    grid = parameter_grid(base_thresholds, vix_high_thresholds, vix_extreme_thresholds)
+
+    signals = model.generate_signals(data, config=config, indicators=indicators)
+    signal_values = signals.to_numpy(dtype=float)
+    prices = data[list(signals.columns)].to_numpy(dtype=float)
+    vix = data['VIX'].to_numpy(dtype=float)
+
+    # The strongest signals of each day do not depend on the thresholds
+    columns, ranked = model.rank_candidates(signal_values, config.top_k)
+
+    if window_years:
+        bounds = model.window_bounds(len(data), window_years * 252)
+
+    results = []
+    for start in range(0, len(grid), chunk_size):
+        chunk = grid.iloc[start:start + chunk_size]
+        threshold = chunk['base_threshold'].to_numpy(dtype=float)[:, None, None]
+        vix_high = chunk['vix_high_threshold'].to_numpy(dtype=float)[:, None, None]
+        vix_extreme = chunk['vix_extreme_threshold'].to_numpy(dtype=float)[:, None, None]
+
+        selected = (ranked[None] > threshold) & ~(vix[None, :, None] > vix_extreme)
+        weight = model.allocation_weights(ranked[None], selected, config.weighting) \
+            * np.where(vix[None, :, None] > vix_high, 0.5, 1.0)
+        chunk_best = np.where(selected, columns[None], -1)
+
+        values = simulate_batch(prices, chunk_best, weight, config.min_history,
+                                config.initial_capital)
+        chunk_metrics = pd.DataFrame(metrics.compute_metrics(values), index=chunk.index)
+
+        if window_years and bounds:
+            returns = np.zeros_like(values)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns[:, 1:] = values[:, 1:] / values[:, :-1] - 1
+            chunk_metrics['avg_window_sharpe'] = \
+                metrics.window_metrics(values, returns, bounds)['sharpe'].mean(axis=1)
+        results.append(chunk_metrics)
+
+    return pd.concat([grid, pd.concat(results)], axis=1)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+import model
+
+# ----------------- Synthetic Data Parameters -----------------
+START_DATE = '2000-01-03'  # First trading day of generated panels
+TRADING_DAYS = 252  # Trading days per generated year
+SCALES = {
+    'small': (7, 25),  # The real universe (SPY and six sector ETFs) over 25 years
+    'medium': (100, 25),
+    'large': (500, 25),
+}
+VIX_MEAN = 19.0  # Long-run VIX level
+VIX_REVERSION = 0.05  # Daily pull of VIX back to its mean
+VIX_MARKET_SENSITIVITY = 300.0  # VIX points added per unit of negative market return
+
+
+def ticker_names(n_tickers):
+    """
+    Return column names for a panel of n_tickers tradable series
+
+    The first names are SPY and the sector ETFs of model.ETFS, so small panels
+    look like the real universe; larger panels continue with T007, T008, ...
+    """
+    names = list(model.ETFS[:n_tickers])
+    names += [f"T{i:03d}" for i in range(len(names), n_tickers)]
+    return names
+
+
+def make_price_panel(n_tickers=7, years=25, seed=0, start_date=START_DATE):
+    """
+    Build a deterministic synthetic price panel with a VIX column
+
+    Prices follow a one-factor model: SPY is the market and every other ticker
+    moves with the market times its beta plus idiosyncratic noise. VIX mean
+    reverts and jumps on market sell-offs, so the VIX sizing rules trigger as
+    they do on real data.
+
+    Args:
+        n_tickers: Number of price columns, SPY included
+        years: Length of the panel in years of 252 trading days
+        seed: Random seed; the same arguments always give the same panel
+        start_date: First date of the business-day index
+
+    Returns:
+        DataFrame indexed by datetime.date with one column per ticker and VIX,
+        shaped like the output of model.download_data
+    """
+    rng = np.random.default_rng(seed)
+    n_days = int(round(years * TRADING_DAYS))
+
+    market = rng.normal(0.0003, 0.011, n_days)
+    betas = rng.uniform(0.6, 1.4, n_tickers)
+    betas[0] = 1.0
+    noise = rng.normal(0.0001, 0.009, (n_days, n_tickers))
+    noise[:, 0] = 0.0
+    returns = market[:, None] * betas + noise
+    prices = rng.uniform(20, 200, n_tickers) * np.exp(np.cumsum(returns, axis=0))
+
+    shocks = rng.normal(0, 1.5, n_days)
+    vix = np.empty(n_days)
+    level = VIX_MEAN
+    for i in range(n_days):
+        level += VIX_REVERSION * (VIX_MEAN - level) - VIX_MARKET_SENSITIVITY * market[i] + shocks[i]
+        level = min(max(level, 9.0), 85.0)
+        vix[i] = level
+
+    index = pd.bdate_range(start_date, periods=n_days).date
+    data = pd.DataFrame(prices, index=index, columns=ticker_names(n_tickers))
+    data['VIX'] = vix
+    return data
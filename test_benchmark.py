@@ -0,0 +1,37 @@
+import pandas as pd
+
+import benchmark
+import synthetic_data
+
+
+def test_synthetic_panel_is_deterministic():
+    first = synthetic_data.make_price_panel(12, 2, seed=3)
+    second = synthetic_data.make_price_panel(12, 2, seed=3)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert list(first.columns[:7]) == ['SPY', 'XLK', 'XLV', 'XLE', 'XLF', 'XLI', 'XLY']
+    assert first.columns[-1] == 'VIX'
+    assert len(first) == 2 * 252
+    assert not first.isnull().any().any()
+
+
+def test_every_stage_is_timed():
+    result = benchmark.benchmark_scale(4, 2, repeat=1)
+
+    assert result['n_days'] == 504
+    assert set(result['stages']) == {
+        'download_data', 'generate_signals', 'backtest', 'backtest_top_k', 'rolling_backtest',
+        'rolling_backtest_single_pass', 'series_metrics', 'compute_metrics',
+        'window_metrics', 'optimizer_iteration',
+    }
+    assert all(timing['best'] > 0 for timing in result['stages'].values())
+
+
+def test_compare_flags_slow_stages():
+    def run(backtest, signals):
+        return {'results': {'small': {'stages': {
+            'backtest': {'best': backtest}, 'generate_signals': {'best': signals}}}}}
+
+    regressions = benchmark.compare(run(0.5, 0.011), run(0.1, 0.010), threshold=0.2)
+
+    assert [(scale, stage) for scale, stage, *_ in regressions] == [('small', 'backtest')]
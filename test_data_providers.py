@@ -0,0 +1,104 @@
+import sys
+import types
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_providers
+import model
+
+TICKERS = ['SPY', 'XLK', 'XLV', 'XLE', 'XLF', 'XLI', 'XLY']
+
+
+def _frame(periods=40):
+    index = pd.bdate_range("2021-01-04", periods=periods).date
+    columns = TICKERS + ['VIX']
+    return pd.DataFrame(
+        {col: 20.0 + i + np.arange(periods) * 0.5 for i, col in enumerate(columns)},
+        index=index,
+    )
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_file_provider_round_trip(tmp_path, file_format):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    data = _frame()
+    data_providers.FileProvider.save_frame(data, str(tmp_path), file_format=file_format)
+    provider = data_providers.FileProvider(str(tmp_path))
+
+    vix = provider.fetch('^VIX', '2021-01-01', '2030-01-01')
+    assert list(vix.index) == list(data.index)
+    assert np.allclose(vix.values, data['VIX'].values)
+
+    sliced = provider.fetch('XLK', data.index[5], data.index[10])
+    assert list(sliced.index) == list(data.index[5:10])
+
+
+def test_download_data_from_file_provider(tmp_path):
+    data = _frame()
+    data_providers.FileProvider.save_frame(data, str(tmp_path))
+
+    loaded = model.download_data('2021-01-01', store=None,
+                                 provider=data_providers.FileProvider(str(tmp_path)))
+
+    assert list(loaded.columns) == list(data.columns)
+    assert np.allclose(loaded.values, data.values)
+
+
+def test_download_data_reports_all_missing_tickers(tmp_path, capsys):
+    data = _frame().drop(columns=['XLE', 'XLY'])
+    data_providers.FileProvider.save_frame(data, str(tmp_path))
+
+    loaded = model.download_data('2021-01-01', store=None,
+                                 provider=data_providers.FileProvider(str(tmp_path)))
+
+    assert loaded is None
+    output = capsys.readouterr().out
+    assert "No data available for XLE" in output
+    assert "No data available for XLY" in output
+
+
+def test_yfinance_provider_retries_with_backoff(monkeypatch):
+    attempts = {}
+    index = pd.DatetimeIndex(pd.bdate_range("2021-01-04", periods=3), tz="America/New_York")
+
+    class FakeTicker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def history(self, start, end):
+            attempts[self.symbol] = attempts.get(self.symbol, 0) + 1
+            if attempts[self.symbol] < 3:
+                raise ConnectionError("rate limited")
+            return pd.DataFrame({'Close': [1.0, 2.0, 3.0]}, index=index)
+
+    monkeypatch.setitem(sys.modules, 'yfinance', types.SimpleNamespace(Ticker=FakeTicker))
+    delays = []
+    monkeypatch.setattr(data_providers.time, 'sleep', delays.append)
+
+    provider = data_providers.YFinanceProvider(max_workers=4, max_retries=3, backoff=0.5)
+    results = provider.fetch_many({'SPY': '2021-01-01', 'XLK': '2021-01-01'}, '2021-02-01')
+
+    assert attempts == {'SPY': 3, 'XLK': 3}
+    assert sorted(delays) == [0.5, 0.5, 1.0, 1.0]
+    assert list(results['SPY'].index) == [date(2021, 1, 4), date(2021, 1, 5), date(2021, 1, 6)]
+
+
+def test_yfinance_provider_gives_up_after_max_retries(monkeypatch):
+    class BrokenTicker:
+        def __init__(self, symbol):
+            pass
+
+        def history(self, start, end):
+            raise ConnectionError("offline")
+
+    monkeypatch.setitem(sys.modules, 'yfinance', types.SimpleNamespace(Ticker=BrokenTicker))
+    monkeypatch.setattr(data_providers.time, 'sleep', lambda delay: None)
+
+    provider = data_providers.YFinanceProvider(max_retries=2)
+    results = provider.fetch_many({'SPY': '2021-01-01'}, '2021-02-01')
+
+    assert results == {}
@@ -0,0 +1,74 @@
+"""
+Golden-output regression tests
+
+The files in testdata/golden pin the portfolio, positions and rolling window
+metrics of the reference loop engine on a fixed synthetic dataset. Any engine
+or refactoring must reproduce them. After an intentional change of strategy
+semantics, regenerate the files with
+
+    UPDATE_GOLDEN=1 python -m pytest test_golden.py
+"""
+import os
+
+import pandas as pd
+import pytest
+
+import model
+import synthetic_data
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'golden')
+UPDATE_GOLDEN = os.getenv('UPDATE_GOLDEN') == '1'
+GOLDEN_YEARS = 6
+GOLDEN_SEED = 19
+
+
+@pytest.fixture(scope='module')
+def golden_data():
+    return synthetic_data.make_price_panel(len(model.ETFS), GOLDEN_YEARS, seed=GOLDEN_SEED)
+
+
+@pytest.fixture(scope='module')
+def config():
+    # Explicit defaults, so changing the module-level parameters does not move the goldens
+    return model.StrategyConfig()
+
+
+def _with_string_dates(frame):
+    frame = frame.copy()
+    frame.index = [str(day) for day in frame.index]
+    for column in ('Start Date', 'End Date'):
+        if column in frame.columns:
+            frame[column] = frame[column].astype(str)
+    return frame
+
+
+def check_golden(frame, name):
+    """Compare a frame with its golden file, or rewrite the file when UPDATE_GOLDEN=1"""
+    path = os.path.join(GOLDEN_DIR, name + '.csv')
+    frame = _with_string_dates(frame)
+    if UPDATE_GOLDEN:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        frame.to_csv(path, float_format='%.17g')
+        return
+    expected = pd.read_csv(path, index_col=0, dtype={'Start Date': str, 'End Date': str})
+    expected.index = expected.index.astype(str)
+    pd.testing.assert_frame_equal(frame, expected, check_dtype=False, rtol=1e-10, atol=1e-8)
+
+
+@pytest.mark.parametrize('engine', ['loop', 'array'])
+def test_backtest_matches_golden(golden_data, config, engine):
+    signals = model.generate_signals(golden_data, config=config)
+    portfolio, positions = model.backtest(golden_data, signals, engine=engine, config=config)
+
+    check_golden(portfolio, 'portfolio')
+    check_golden(positions, 'positions')
+
+
+def test_rolling_backtest_matches_golden(golden_data, config):
+    check_golden(model.rolling_backtest(golden_data, window_years=1, config=config), 'rolling')
+
+
+def test_single_pass_rolling_backtest_matches_golden(golden_data, config):
+    results = model.rolling_backtest(golden_data, window_years=1, single_pass=True, step_days=63,
+                                     config=config)
+    check_golden(results, 'rolling_single_pass')
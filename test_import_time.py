@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Import cost allowed on top of numpy and pandas, which every module needs
+IMPORT_BUDGET_SECONDS = 0.3
+# Heavy dependencies that must only load when plotting, downloading, optimizing or calling the LLM
+LAZY_MODULES = ('matplotlib', 'yfinance', 'google.generativeai', 'skopt')
+
+
+def import_times(module):
+    """Run `python -X importtime` for one module and return {module: cumulative seconds}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import numpy, pandas; import {module}'],
+        capture_output=True, text=True, cwd=REPO_DIR, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+@pytest.mark.parametrize('module', ['metrics', 'model', 'optimize', 'result_cache',
+                                    'strategy_analysis_agent', 'incremental'])
+def test_import_stays_within_budget(module):
+    times = import_times(module)
+
+    loaded = [name for name in LAZY_MODULES if name in times]
+    assert not loaded, f"import {module} loads {loaded}"
+    assert times[module] < IMPORT_BUDGET_SECONDS
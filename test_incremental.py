@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import incremental
+import model
+import synthetic_data
+
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic_data.make_price_panel(7, 4, seed=21)
+
+
+@pytest.fixture(scope='module')
+def config():
+    return model.StrategyConfig(window=60, min_history=60)
+
+
+@pytest.fixture(scope='module')
+def replay(data, config):
+    signals = model.generate_signals(data, config=config)
+    portfolio, positions = model.backtest(data, signals, config=config)
+    return signals, portfolio, positions
+
+
+def test_daily_updates_match_full_replay_bit_for_bit(data, config, replay):
+    signals, portfolio, positions = replay
+    state = incremental.StrategyState(data.columns, config)
+    results = state.update_many(data)
+
+    assert np.array_equal([r['value'] for r in results], portfolio['value'].to_numpy())
+    assert np.array_equal([r['return'] for r in results], portfolio['return'].to_numpy())
+    assert np.array_equal([list(r['positions'].values()) for r in results], positions.to_numpy())
+    tradable = list(results[-1]['signals'])
+    assert np.array_equal([[r['signals'][col] for col in tradable] for r in results],
+                          signals[tradable].to_numpy(), equal_nan=True)
+
+
+def test_saved_state_resumes_exactly(data, config, replay, tmp_path):
+    _, portfolio, _ = replay
+    split = len(data) - 5
+    path = str(tmp_path / 'state.json')
+    incremental.StrategyState.from_history(data.iloc[:split], config).save(path)
+
+    state = incremental.StrategyState.load(path)
+    results = [state.update(day, data.loc[day]) for day in data.index[split:]]
+
+    assert np.array_equal([r['value'] for r in results], portfolio['value'].to_numpy()[split:])
+    full = incremental.StrategyState.from_history(data, config)
+    assert state.to_dict() == full.to_dict()
+
+
+def test_readjusted_history_is_replayed(data, config, tmp_path):
+    split = len(data) - 5
+    path = str(tmp_path / 'state.json')
+    incremental.StrategyState.from_history(data.iloc[:split], config).save(path)
+
+    # A dividend re-adjusts every close before the ex-date
+    adjusted = data.copy()
+    adjusted.iloc[:split - 2, 0] *= 0.99
+    state = incremental.StrategyState.load(path)
+    results = state.update_many(adjusted)
+
+    full = incremental.StrategyState.from_history(adjusted, config)
+    assert [r['date'] for r in results] == list(data.index[split:])
+    assert state.to_dict() == full.to_dict()
+
+
+def test_top_k_updates_match_full_replay(data, config):
+    top_k = config.replace(top_k=3, weighting='signal', base_threshold=0.0)
+    portfolio, positions = model.backtest(data, model.generate_signals(data, config=top_k), config=top_k)
+    results = incremental.StrategyState(data.columns, top_k).update_many(data)
+
+    assert np.array_equal([r['value'] for r in results], portfolio['value'].to_numpy())
+    assert np.array_equal([list(r['positions'].values()) for r in results], positions.to_numpy())
+    assert max(len(r['target_weights']) for r in results) == 3
+
+
+def test_bars_must_be_new(data, config):
+    state = incremental.StrategyState.from_history(data.iloc[:100], config)
+
+    with pytest.raises(ValueError):
+        state.update(data.index[99], data.iloc[99])
+    assert state.update_many(data.iloc[:100]) == []
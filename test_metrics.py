@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import metrics
+import model
+
+
+@pytest.fixture
+def paths():
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.012, (5, 400))
+    returns[:, 0] = 0.0
+    returns[2, 50:120] = 0.0
+    return 1000 * np.cumprod(1 + returns, axis=1)
+
+
+def test_batch_metrics_match_series_functions(paths):
+    result = metrics.compute_metrics(paths)
+
+    for i, row in enumerate(paths):
+        values = pd.Series(row)
+        returns = values.pct_change().fillna(0)
+        assert result['annual_return'][i] == pytest.approx(model.calculate_annual_return(values))
+        assert result['annual_volatility'][i] == pytest.approx(model.calculate_annual_volatility(returns))
+        assert result['sharpe'][i] == pytest.approx(model.calculate_sharpe_ratio(returns))
+        assert result['max_drawdown'][i] == pytest.approx(model.calculate_max_drawdown(values))
+        assert result['turnover'][i] == pytest.approx(model.calculate_average_turnover(values))
+
+
+def test_sortino_calmar_and_hit_rate(paths):
+    result = metrics.compute_metrics(paths)
+
+    row = paths[2]
+    returns = np.diff(row) / row[:-1]
+    downside = np.sqrt(np.mean(np.minimum(np.concatenate([[0.0], returns]), 0) ** 2)) * np.sqrt(252)
+    excess = np.concatenate([[0.0], returns]).mean() * 252 - metrics.RISK_FREE_RATE
+    assert result['sortino'][2] == pytest.approx(excess / downside)
+    assert result['calmar'][2] == pytest.approx(result['annual_return'][2] / result['max_drawdown'][2])
+    assert result['hit_rate'][2] == pytest.approx((returns > 0).sum() / (returns != 0).sum())
+
+
+def test_ragged_paths_match_rectangular_rows(paths):
+    ragged = [paths[0], paths[1, :250], paths[2], paths[3, :250]]
+    result = metrics.compute_metrics(ragged)
+    full = metrics.compute_metrics(paths[[0, 2]])
+    short = metrics.compute_metrics(paths[[1, 3], :250])
+
+    for name in metrics.METRIC_NAMES:
+        np.testing.assert_allclose(result[name], [full[name][0], short[name][0],
+                                                  full[name][1], short[name][1]])
+
+
+def test_window_metrics_match_batch_metrics_on_slices(paths):
+    values = paths[0]
+    returns = np.concatenate([[0.0], np.diff(values) / values[:-1]])
+    bounds = [(0, 100), (30, 130), (250, 400), (0, 400)]
+
+    windowed = metrics.window_metrics(values, returns, bounds)
+
+    for i, (start_idx, end_idx) in enumerate(bounds):
+        batch = metrics.compute_metrics(values[None, start_idx:end_idx])
+        for name in metrics.METRIC_NAMES:
+            assert windowed[name][i] == pytest.approx(batch[name][0], rel=1e-9, abs=1e-12)
+
+
+def test_flat_path_has_zero_ratios():
+    result = metrics.compute_metrics(np.full((1, 50), 100.0))
+
+    assert result['sharpe'][0] == 0.0
+    assert result['sortino'][0] == 0.0
+    assert result['calmar'][0] == 0.0
+    assert np.isnan(result['hit_rate'][0])
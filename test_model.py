@@ -1,9 +1,38 @@
 import unittest
 import model
+import numpy as np
 import pandas as pd
+import pytest
+import synthetic_data
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
+def make_synthetic_data(n_days=600, seed=0):
+    """Build a deterministic price panel of SPY, the sector ETFs and VIX with n_days rows"""
+    return synthetic_data.make_price_panel(len(model.ETFS), n_days / synthetic_data.TRADING_DAYS, seed)
+
+def reference_window_metrics(window_data, portfolio):
+    """Window metrics computed with the single-series metric functions"""
+    spy_returns = window_data['SPY'].pct_change().fillna(0)
+    return {
+        'Start Date': window_data.index[0],
+        'End Date': window_data.index[-1],
+        'Window Days': len(window_data),
+        'Strategy Return': model.calculate_annual_return(portfolio['value']),
+        'Strategy Volatility': model.calculate_annual_volatility(portfolio['return']),
+        'Strategy Sharpe': model.calculate_sharpe_ratio(portfolio['return']),
+        'Strategy Max Drawdown': model.calculate_max_drawdown(portfolio['value']),
+        'SPY Return': model.calculate_annual_return(window_data['SPY']),
+        'SPY Volatility': model.calculate_annual_volatility(spy_returns),
+        'SPY Sharpe': model.calculate_sharpe_ratio(spy_returns),
+        'SPY Max Drawdown': model.calculate_max_drawdown(window_data['SPY']),
+        'Average Turnover': model.calculate_average_turnover(portfolio['value'])
+    }
+
+@pytest.mark.usefixtures('offline_model_data')
 class TestModel(unittest.TestCase):
+    """End-to-end pipeline tests against the offline provider and dataset from conftest.py"""
+    
     def setUp(self):
         """Set up test fixtures"""
         self.start_date = '2000-01-01'
@@ -11,7 +40,7 @@ class TestModel(unittest.TestCase):
     def test_data_download(self):
         """Test if we can successfully download and process data"""
         print("\nTesting data download...")
-        data = model.download_data(self.start_date)
+        data = model.download_data(self.start_date, store=None, provider=self.provider)
         
         # Check if data is not None
         self.assertIsNotNone(data, "Data should not be None")
@@ -34,7 +63,7 @@ class TestModel(unittest.TestCase):
     def test_signal_generation(self):
         """Test if we can generate signals correctly"""
         print("\nTesting signal generation...")
-        data = self.test_data_download()
+        data = self.downloaded
         
         signals = model.generate_signals(data)
         
@@ -53,7 +82,7 @@ class TestModel(unittest.TestCase):
     def test_backtest(self):
         """Test if we can run backtest successfully"""
         print("\nTesting backtest...")
-        data = self.test_data_download()
+        data = self.downloaded
         signals = self.test_signal_generation()
         
         portfolio, positions = model.backtest(data, signals)
@@ -76,7 +105,7 @@ class TestModel(unittest.TestCase):
     def test_rolling_backtest(self):
         """Test if we can run rolling window backtest successfully"""
         print("\nTesting rolling window backtest...")
-        data = self.test_data_download()
+        data = self.downloaded
         
         results = model.rolling_backtest(data)
         
@@ -104,5 +133,279 @@ class TestModel(unittest.TestCase):
         
         return results
 
+class TestSignalEngine(unittest.TestCase):
+    def setUp(self):
+        self.data = make_synthetic_data()
+    
+    def test_matches_pandas_rolling_energy(self):
+        """Vectorized energy should match a pandas rolling mean per column"""
+        for window in (5, 120, 400):
+            energy = model.ma_energy_matrix(self.data.values, window)
+            for i, col in enumerate(self.data.columns):
+                ma = self.data[col].rolling(window=window).mean()
+                expected = ((self.data[col] - ma) / ma).values
+                np.testing.assert_allclose(energy[:, i], expected, rtol=1e-9, atol=1e-12)
+    
+    def test_missing_prices_invalidate_window(self):
+        """A missing price should blank out every window that contains it"""
+        data = self.data.copy()
+        data.iloc[200, 1] = np.nan
+        energy = model.ma_energy_matrix(data.values, 20)
+        self.assertTrue(np.isnan(energy[200:220, 1]).all())
+        self.assertFalse(np.isnan(energy[220:, 1]).any())
+        self.assertFalse(np.isnan(energy[199, 1]))
+    
+    def test_only_tradable_columns_get_signals(self):
+        """Benchmark and VIX columns should never carry a signal"""
+        signals = model.generate_signals(self.data)
+        self.assertTrue(signals.index.equals(self.data.index))
+        self.assertTrue((signals['SPY'] == 0).all())
+        self.assertTrue((signals['VIX'] == 0).all())
+        self.assertFalse(np.isnan(signals['XLK'].iloc[model.WINDOW:]).any())
+        
+        signals = model.generate_signals(self.data, tradable=['XLK', 'XLE'])
+        self.assertTrue((signals[['SPY', 'XLV', 'XLF', 'XLI', 'XLY', 'VIX']] == 0).all().all())
+        self.assertFalse((signals['XLE'].iloc[model.WINDOW:] == 0).all())
+
+class TestBacktestEngines(unittest.TestCase):
+    def setUp(self):
+        self.data = make_synthetic_data(n_days=400, seed=1)
+    
+    def assert_engines_match(self, signals):
+        portfolio_loop, positions_loop = model.backtest(self.data, signals, engine='loop')
+        portfolio_array, positions_array = model.backtest(self.data, signals, engine='array')
+        pd.testing.assert_frame_equal(portfolio_loop, portfolio_array, check_exact=True)
+        pd.testing.assert_frame_equal(positions_loop, positions_array, check_exact=True)
+    
+    def test_array_engine_matches_reference_loop(self):
+        """The array engine should reproduce the reference loop bit for bit"""
+        self.assert_engines_match(model.generate_signals(self.data))
+    
+    def test_array_engine_matches_with_untracked_candidates(self):
+        """Candidates outside the positions table (VIX) should be handled identically"""
+        tradable = [col for col in self.data.columns if col != 'SPY']
+        self.assert_engines_match(model.generate_signals(self.data, tradable=tradable))
+    
+    def test_unknown_engine_is_rejected(self):
+        signals = model.generate_signals(self.data)
+        with self.assertRaises(ValueError):
+            model.backtest(self.data, signals, engine='gpu')
+
+class TestSinglePassRollingBacktest(unittest.TestCase):
+    def setUp(self):
+        self.data = make_synthetic_data(n_days=1300, seed=2)
+    
+    def test_first_window_matches_independent_backtest(self):
+        """The first window has the same history in both modes"""
+        independent = model.rolling_backtest(self.data, window_years=1)
+        single_pass = model.rolling_backtest(self.data, window_years=1, single_pass=True)
+        self.assertEqual(len(independent), len(single_pass))
+        pd.testing.assert_series_equal(independent.iloc[0], single_pass.iloc[0])
+    
+    def test_windows_are_slices_of_one_backtest(self):
+        """Later windows should be evaluated on the full-history portfolio path"""
+        results = model.rolling_backtest(self.data, window_years=1, single_pass=True)
+        portfolio, _ = model.backtest(self.data, model.generate_signals(self.data))
+        values = portfolio['value'].iloc[252:504]
+        returns = portfolio['return'].iloc[252:504].copy()
+        returns.iloc[0] = 0.0
+        self.assertEqual(results['Start Date'].iloc[1], self.data.index[252])
+        self.assertAlmostEqual(results['Strategy Return'].iloc[1], model.calculate_annual_return(values))
+        self.assertAlmostEqual(results['Strategy Sharpe'].iloc[1], model.calculate_sharpe_ratio(returns))
+    
+    def test_overlapping_windows_match_per_window_metrics(self):
+        """Prefix-sum metrics should agree with the per-window metric functions"""
+        results = model.rolling_backtest(self.data, window_years=1, single_pass=True, step_days=50)
+        portfolio, _ = model.backtest(self.data, model.generate_signals(self.data))
+        bounds = model.window_bounds(len(self.data), 252, step_days=50)
+        self.assertEqual(len(results), len(bounds))
+        expected = []
+        for start_idx, end_idx in bounds:
+            window = portfolio.iloc[start_idx:end_idx].copy()
+            window.iloc[0, window.columns.get_loc('return')] = 0.0
+            expected.append(reference_window_metrics(self.data.iloc[start_idx:end_idx], window))
+        expected = pd.DataFrame(expected)
+        pd.testing.assert_frame_equal(results[expected.columns], expected, rtol=1e-9)
+    
+    def test_precomputed_portfolio_is_reused(self):
+        """Passing the full-history portfolio should skip the backtest and give the same windows"""
+        portfolio, _ = model.backtest(self.data, model.generate_signals(self.data))
+        expected = model.rolling_backtest(self.data, window_years=1, single_pass=True)
+        with patch.object(model, 'backtest', side_effect=AssertionError("backtest called")):
+            results = model.rolling_backtest(self.data, window_years=1, single_pass=True,
+                                             portfolio=portfolio)
+        pd.testing.assert_frame_equal(results, expected)
+    
+    def test_expanding_windows(self):
+        """Anchored windows all start on the first day and grow by the step"""
+        results = model.rolling_backtest(self.data, window_years=1, single_pass=True,
+                                         step_days=100, expanding=True)
+        self.assertTrue((results['Start Date'] == self.data.index[0]).all())
+        self.assertEqual(results['Window Days'].tolist(), list(range(252, len(self.data) + 1, 100)))
+        # The max drawdown can only grow as the window extends
+        self.assertTrue((np.diff(results['Strategy Max Drawdown'].values) >= 0).all())
+    
+    def test_independent_windows_match_per_window_metrics(self):
+        """Batched window metrics should agree with the per-window metric functions"""
+        results = model.rolling_backtest(self.data, window_years=1, step_days=200)
+        expected = []
+        for start_idx, end_idx in model.window_bounds(len(self.data), 252, step_days=200):
+            window_data = self.data.iloc[start_idx:end_idx]
+            portfolio, _ = model.backtest(window_data, model.generate_signals(window_data))
+            expected.append(reference_window_metrics(window_data, portfolio))
+        expected = pd.DataFrame(expected)
+        pd.testing.assert_frame_equal(results[expected.columns], expected, rtol=1e-9)
+    
+    def test_window_bounds(self):
+        self.assertEqual(model.window_bounds(10, 4), [(0, 4), (4, 8)])
+        self.assertEqual(model.window_bounds(10, 4, step_days=3), [(0, 4), (3, 7), (6, 10)])
+        self.assertEqual(model.window_bounds(10, 4, step_days=3, expanding=True),
+                         [(0, 4), (0, 7), (0, 10)])
+
+class TestParallelRollingBacktest(unittest.TestCase):
+    def setUp(self):
+        self.data = make_synthetic_data(n_days=1300, seed=3)
+    
+    def test_workers_match_serial_results(self):
+        """Windows evaluated on a process pool should come back identical and in order"""
+        config = model.StrategyConfig(base_threshold=0.05)
+        serial = model.rolling_backtest(self.data, window_years=1, config=config)
+        parallel = model.rolling_backtest(self.data, window_years=1, workers=2, config=config)
+        pd.testing.assert_frame_equal(serial, parallel, check_exact=True)
+
+class TestStrategyConfig(unittest.TestCase):
+    def setUp(self):
+        self.data = make_synthetic_data(n_days=400, seed=4)
+    
+    def test_config_is_hashable_and_immutable(self):
+        config = model.StrategyConfig(ma_windows=[10, 40, 140])
+        self.assertEqual(config.ma_windows, (10, 40, 140))
+        self.assertEqual(hash(config), hash(model.StrategyConfig()))
+        with self.assertRaises(Exception):
+            config.base_threshold = 0.2
+        self.assertEqual(config.replace(base_threshold=0.2).base_threshold, 0.2)
+    
+    def test_defaults_follow_module_parameters(self):
+        """Calls without a config keep honouring the module-level parameters"""
+        saved = model.BASE_THRESHOLD
+        try:
+            model.BASE_THRESHOLD = 0.05
+            self.assertEqual(model.StrategyConfig.from_globals().base_threshold, 0.05)
+            signals = model.generate_signals(self.data)
+            expected, _ = model.backtest(self.data, signals,
+                                         config=model.StrategyConfig(base_threshold=0.05))
+            portfolio, _ = model.backtest(self.data, signals)
+            pd.testing.assert_frame_equal(portfolio, expected)
+        finally:
+            model.BASE_THRESHOLD = saved
+    
+    def test_engines_agree_under_custom_config(self):
+        config = model.StrategyConfig(window=60, min_history=60, base_threshold=0.03,
+                                      vix_high_threshold=20, vix_extreme_threshold=35,
+                                      initial_capital=50000.0)
+        signals = model.generate_signals(self.data, config=config)
+        self.assertFalse(np.isnan(signals['XLK'].iloc[59]))
+        portfolio_loop, positions_loop = model.backtest(self.data, signals, engine='loop', config=config)
+        portfolio_array, positions_array = model.backtest(self.data, signals, config=config)
+        pd.testing.assert_frame_equal(portfolio_loop, portfolio_array, check_exact=True)
+        pd.testing.assert_frame_equal(positions_loop, positions_array, check_exact=True)
+        self.assertEqual(portfolio_array['value'].iloc[0], 50000.0)
+
+class TestTopKAllocation(unittest.TestCase):
+    def setUp(self):
+        self.data = make_synthetic_data(n_days=400, seed=6)
+    
+    def test_engines_agree_for_top_k(self):
+        """Both engines should hold the same K positions with identical values"""
+        for weighting in model.WEIGHTINGS:
+            config = model.StrategyConfig(window=60, min_history=60, base_threshold=0.0,
+                                          top_k=3, weighting=weighting)
+            signals = model.generate_signals(self.data, config=config)
+            portfolio_loop, positions_loop = model.backtest(self.data, signals, engine='loop', config=config)
+            portfolio_array, positions_array = model.backtest(self.data, signals, config=config)
+            pd.testing.assert_frame_equal(portfolio_loop, portfolio_array, check_exact=True)
+            pd.testing.assert_frame_equal(positions_loop, positions_array, check_exact=True)
+            # Holdings that leave the top K are sold on the next trade
+            self.assertLessEqual((positions_array > 0).sum(axis=1).max(), 3)
+            self.assertGreater((positions_array > 0).any().sum(), 3)
+    
+    def test_single_asset_mode_keeps_earlier_holdings(self):
+        """top_k=1 keeps the original rules: positions are resized, never sold"""
+        config = model.StrategyConfig(window=60, min_history=60, base_threshold=0.0)
+        signals = model.generate_signals(self.data, config=config)
+        _, positions = model.backtest(self.data, signals, config=config)
+        self.assertGreater((positions > 0).sum(axis=1).max(), 1)
+    
+    def test_target_weights(self):
+        config = model.StrategyConfig(base_threshold=0.1, top_k=3, weighting='signal')
+        day = self.data.index[0]
+        signals = pd.DataFrame([[0, 0.4, 0.2, 0.05, 0.2, np.nan, 0.3, 0]],
+                               index=[day], columns=self.data.columns)
+        data = self.data.iloc[:1].copy()
+        data['VIX'] = 15
+        
+        weights = model.get_target_weights(signals, day, {}, data, {}, config)
+        self.assertEqual(list(weights), ['XLK', 'XLY', 'XLV'])
+        self.assertAlmostEqual(weights['XLK'], 0.4 / 0.9)
+        self.assertAlmostEqual(sum(weights.values()), 1.0)
+        
+        equal = model.get_target_weights(signals, day, {}, data, {}, config.replace(weighting='equal'))
+        self.assertEqual(equal, {'XLK': 1 / 3, 'XLY': 1 / 3, 'XLV': 1 / 3})
+        
+        data['VIX'] = config.vix_high_threshold + 1
+        halved = model.get_target_weights(signals, day, {}, data, {}, config.replace(weighting='equal'))
+        self.assertEqual(halved, {'XLK': 0.5 / 3, 'XLY': 0.5 / 3, 'XLV': 0.5 / 3})
+    
+    def test_rank_candidates_breaks_ties_by_column(self):
+        signal_values = np.array([[0.1, 0.3, 0.3, np.nan, 0.3],
+                                  [np.nan, 0.2, 0.5, 0.1, 0.0]])
+        columns, ranked = model.rank_candidates(signal_values, 2)
+        np.testing.assert_array_equal(columns, [[1, 2], [2, 1]])
+        np.testing.assert_array_equal(ranked, [[0.3, 0.3], [0.5, 0.2]])
+        
+        columns, _ = model.rank_candidates(signal_values, 1)
+        np.testing.assert_array_equal(columns[:, 0], np.nanargmax(signal_values, axis=1))
+    
+    def test_invalid_allocation_is_rejected(self):
+        with self.assertRaises(ValueError):
+            model.StrategyConfig(top_k=0)
+        with self.assertRaises(ValueError):
+            model.StrategyConfig(weighting='inverse_vol')
+
+class TestIndicatorCache(unittest.TestCase):
+    def setUp(self):
+        self.data = make_synthetic_data(n_days=1300, seed=5)
+        self.cache = model.IndicatorCache(self.data)
+    
+    def test_matches_direct_computation(self):
+        """Cached energy should be bit-identical to ma_energy_matrix"""
+        self.cache.precompute(range(100, 141, 10))
+        for window in (100, 120, 140):
+            expected = model.ma_energy_matrix(self.data.values, window)
+            cached = self.cache.energy_matrix(list(self.data.columns), window)
+            np.testing.assert_array_equal(cached, expected)
+        self.assertEqual(len(self.cache._energy), 5 * len(self.data.columns))
+    
+    def test_series_are_computed_once(self):
+        first = self.cache.energy('XLK', 60)
+        stored = self.cache._energy[('XLK', 60)]
+        self.cache.energy_matrix(['XLK', 'XLE'], 60)
+        self.assertIs(self.cache._energy[('XLK', 60)], stored)
+        self.assertEqual(sorted(self.cache._energy), [('XLE', 60), ('XLK', 60)])
+        pd.testing.assert_series_equal(first, model.ma_energy(self.data['XLK'], 60))
+    
+    def test_generate_signals_uses_cache(self):
+        expected = model.generate_signals(self.data)
+        pd.testing.assert_frame_equal(model.generate_signals(self.data, indicators=self.cache), expected)
+        with self.assertRaises(ValueError):
+            model.generate_signals(self.data.iloc[1:], indicators=self.cache)
+    
+    def test_rolling_backtest_with_cache(self):
+        config = model.StrategyConfig(base_threshold=0.05)
+        expected = model.rolling_backtest(self.data, window_years=1, config=config)
+        cached = model.rolling_backtest(self.data, window_years=1, config=config,
+                                        indicators=self.cache)
+        pd.testing.assert_frame_equal(cached, expected, rtol=1e-9)
+
 if __name__ == '__main__':
     unittest.main(argv=[''], verbosity=2)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import model
+import optimize
+import synthetic_data
+
+PARAMS = [0.1, 30, 10, 40, 140, 0.05, 0.20, 25.0, 50.0]
+
+
+@pytest.fixture
+def data():
+    return synthetic_data.make_price_panel(7, 6, seed=11)
+
+
+@pytest.fixture
+def no_download(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("objective should not download data")
+
+    monkeypatch.setattr(model, "download_data", fail)
+
+
+def test_objective_uses_the_given_data(data, no_download):
+    score = optimize.objective(PARAMS, data)
+
+    expected = model.rolling_backtest(data)['Strategy Sharpe'].mean()
+    assert score == pytest.approx(-expected)
+
+
+def test_objective_leaves_module_parameters_alone(data, no_download):
+    params = [0.2, 12, 30, 20, 120, 0.1, 0.15, 30.0, 45.0]
+
+    optimize.objective(params, data)
+
+    assert model.BASE_THRESHOLD == 0.1
+    assert model.MA_WINDOWS == [10, 40, 140]
+    assert model.VIX_HIGH_THRESHOLD == 25
+
+
+def test_params_to_config():
+    config = optimize.params_to_config([0.2, 12.0, 30, 20, 120, 0.1, 0.15, 30, 45])
+
+    assert config.base_threshold == 0.2
+    assert config.vol_window == 12
+    assert config.ma_windows == (20, 30, 120)
+    assert config.vix_extreme_threshold == 45.0
+    assert hash(config) == hash(optimize.params_to_config([0.2, 12, 30, 20, 120, 0.1, 0.15, 30, 45]))
+
+
+def test_objective_rejects_short_data(data, no_download):
+    assert optimize.objective(PARAMS, data.iloc[:100]) == 0
+
+
+def test_load_data_from_frozen_snapshot(data, tmp_path, no_download):
+    path = str(tmp_path / "snapshot.csv")
+    model.save_dataset(data, path)
+
+    loaded = optimize.load_data(path)
+
+    assert list(loaded.index) == list(data.index)
+    np.testing.assert_allclose(loaded.values, data.values)
+
+
+def test_optimize_parameters_runs_on_frozen_data(data, no_download):
+    best_params, best_score = optimize.optimize_parameters(data, n_calls=3, n_random_starts=3)
+
+    assert len(best_params) == len(PARAMS)
+    assert np.isfinite(best_score)
+
+
+def test_parse_args():
+    args = optimize.parse_args(['--data', 'snapshot.parquet', '--n-calls', '12'])
+
+    assert args.data == 'snapshot.parquet'
+    assert args.n_calls == 12
+    assert args.start_date == optimize.OPTIMIZATION_START_DATE
+
+
+def test_batched_optimization_evaluates_all_points(data, no_download, capsys):
+    best_params, best_score = optimize.optimize_parameters_batched(
+        data, n_calls=6, batch_size=3, workers=2, n_initial_points=3)
+
+    assert len(best_params) == len(PARAMS)
+    assert np.isfinite(best_score)
+    output = capsys.readouterr().out
+    assert "Evaluated 6/6 points" in output
+    assert "evaluations/s" in output
@@ -0,0 +1,83 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import model
+import price_panel
+import robustness
+import synthetic_data
+
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic_data.make_price_panel(40, 3, seed=8)
+
+
+def test_float64_panel_round_trips_exactly(data):
+    panel = price_panel.PricePanel.from_frame(data)
+
+    assert panel.values.flags['C_CONTIGUOUS']
+    assert panel.days.dtype == np.int32
+    assert panel.days[0] == data.index[0].toordinal()
+    pd.testing.assert_frame_equal(panel.to_frame(), data)
+
+
+def test_float32_panel_halves_memory(data):
+    panel = price_panel.PricePanel.from_frame(data, dtype=np.float32)
+
+    assert panel.values.nbytes * 2 == data.to_numpy().nbytes
+    np.testing.assert_allclose(panel.to_frame().to_numpy(), data.to_numpy(), rtol=1e-6)
+
+
+def test_positional_access(data):
+    panel = price_panel.PricePanel.from_frame(data)
+
+    row = panel.row_of(data.index[123])
+    assert row == 123
+    assert panel.row_of('2000-01-03') == 0
+    assert panel.price(row, 'XLE') == data['XLE'].iloc[123]
+    assert np.shares_memory(panel.column('XLE'), panel.values)
+    with pytest.raises(KeyError):
+        panel.row_of(date(2000, 1, 1))
+
+
+def test_select_and_slice(data):
+    panel = price_panel.PricePanel.from_frame(data)
+
+    subset = panel.select(['VIX', 'SPY']).slice(10, 20)
+    pd.testing.assert_frame_equal(subset.to_frame(), data[['VIX', 'SPY']].iloc[10:20])
+
+
+def test_npz_dataset_snapshot(data, tmp_path):
+    path = str(tmp_path / 'snapshot.npz')
+    model.save_dataset(data, path)
+
+    pd.testing.assert_frame_equal(model.load_dataset(path), data)
+
+
+def test_invalid_panels_are_rejected():
+    with pytest.raises(ValueError):
+        price_panel.PricePanel(np.zeros((3, 2)), [1, 2, 3], ['A'])
+    with pytest.raises(ValueError):
+        price_panel.PricePanel(np.zeros((3, 1)), [1, 3, 2], ['A'])
+
+
+def test_strategy_runs_on_a_panel(data):
+    panel = price_panel.PricePanel.from_frame(data)
+    config = model.StrategyConfig(window=60, min_history=60)
+
+    signals = model.generate_signals(panel, config=config)
+    pd.testing.assert_frame_equal(signals, model.generate_signals(data, config=config))
+    for engine in ('array', 'loop'):
+        portfolio, positions = model.backtest(panel, signals, config=config, engine=engine)
+        expected_portfolio, expected_positions = model.backtest(data, signals, config=config,
+                                                                engine=engine)
+        pd.testing.assert_frame_equal(portfolio, expected_portfolio)
+        pd.testing.assert_frame_equal(positions, expected_positions)
+
+    subset = panel.select(['SPY', 'XLE', 'XLK', 'VIX'])
+    pd.testing.assert_frame_equal(
+        robustness.run_robustness(subset, 4, config=config, seed=1),
+        robustness.run_robustness(subset.to_frame(), 4, config=config, seed=1))
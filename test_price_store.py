@@ -0,0 +1,130 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import data_providers
+import model
+import price_store
+
+
+def _prices(start, periods, base=100.0):
+    index = pd.bdate_range(start, periods=periods).date
+    return pd.Series(base + np.arange(periods, dtype=float), index=index)
+
+
+def test_store_round_trip(tmp_path):
+    store = price_store.PriceStore(str(tmp_path / "prices.sqlite"))
+    prices = _prices("2020-01-01", 10)
+
+    store.write("XLK", prices, start_date="2020-01-01", checked="2020-01-15")
+
+    stored = store.read("XLK")
+    assert list(stored.index) == list(prices.index)
+    assert np.array_equal(stored.values, prices.values)
+    assert store.coverage("XLK") == {
+        "start": "2020-01-01",
+        "last": prices.index[-1].isoformat(),
+        "checked": "2020-01-15",
+    }
+    assert len(store.read("XLK", start_date=prices.index[5])) == 5
+
+
+class FakeProvider(data_providers.DataProvider):
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def fetch(self, symbol, start_date, end_date):
+        self.calls.append((symbol, str(start_date)[:10]))
+        start = date.fromisoformat(str(start_date)[:10])
+        end = date.fromisoformat(str(end_date)[:10])
+        return self.prices[(self.prices.index >= start) & (self.prices.index < end)]
+
+
+def test_incremental_top_up_fetches_only_new_bars(tmp_path):
+    store = price_store.PriceStore(str(tmp_path / "prices.sqlite"))
+    full = _prices("2020-01-01", 30)
+    provider = FakeProvider(full)
+
+    first = model._load_histories(["XLK"], "2020-01-01", full.index[20].isoformat(),
+                                  store, False, provider)
+    assert len(first["XLK"]) == 20
+
+    second = model._load_histories(["XLK"], "2020-01-01", "2030-01-01", store, False, provider)
+    assert len(second["XLK"]) == 30
+    assert provider.calls == [("XLK", "2020-01-01"), ("XLK", full.index[19].isoformat())]
+
+    # Already checked up to the end date: served from the store without fetching
+    model._load_histories(["XLK"], "2020-01-01", "2030-01-01", store, False, provider)
+    assert len(provider.calls) == 2
+
+
+def test_empty_top_up_is_recorded_as_checked(tmp_path):
+    store = price_store.PriceStore(str(tmp_path / "prices.sqlite"))
+    stored = _prices("2020-01-01", 10)
+    store.write("XLK", stored, start_date="2020-01-01", checked=stored.index[-1].isoformat())
+    # No bars since the last stored one, e.g. on a weekend or before the close
+    provider = FakeProvider(stored.iloc[:0])
+
+    for _ in range(2):
+        result = model._load_histories(["XLK"], "2020-01-01", "2030-01-01", store, False, provider)
+        assert len(result["XLK"]) == 10
+    assert len(provider.calls) == 1
+    assert store.coverage("XLK")["checked"] == "2030-01-01"
+    assert store.coverage("XLK")["last"] == stored.index[-1].isoformat()
+
+
+def test_failed_top_up_is_not_recorded_as_checked(tmp_path):
+    class FlakyProvider(FakeProvider):
+        def fetch(self, symbol, start_date, end_date):
+            if not self.calls:
+                self.calls.append((symbol, str(start_date)[:10]))
+                raise ConnectionError("offline")
+            return super().fetch(symbol, start_date, end_date)
+
+    store = price_store.PriceStore(str(tmp_path / "prices.sqlite"))
+    full = _prices("2020-01-01", 15)
+    stored = full.iloc[:10]
+    store.write("XLK", stored, start_date="2020-01-01", checked=stored.index[-1].isoformat())
+    provider = FlakyProvider(full)
+
+    result = model._load_histories(["XLK"], "2020-01-01", "2030-01-01", store, False, provider)
+    assert len(result["XLK"]) == 10
+    assert store.coverage("XLK")["checked"] == stored.index[-1].isoformat()
+
+    # The next call retries the top-up instead of serving stale prices
+    result = model._load_histories(["XLK"], "2020-01-01", "2030-01-01", store, False, provider)
+    assert len(result["XLK"]) == 15
+    assert len(provider.calls) == 2
+    assert store.coverage("XLK")["checked"] == "2030-01-01"
+
+
+def test_readjusted_history_is_downloaded_again(tmp_path):
+    store = price_store.PriceStore(str(tmp_path / "prices.sqlite"))
+    original = _prices("2020-01-01", 10)
+    store.write("XLK", original, start_date="2020-01-01", checked=original.index[-1].isoformat())
+    adjusted = _prices("2020-01-01", 15, base=90.0)
+
+    result = model._load_histories(["XLK"], "2020-01-01", "2030-01-01", store, False,
+                                   FakeProvider(adjusted))
+    assert np.array_equal(result["XLK"].values, adjusted.values)
+
+
+def test_download_data_offline_from_seeded_store(tmp_path):
+    class NoNetwork(data_providers.DataProvider):
+        def fetch(self, symbol, start_date, end_date):
+            raise AssertionError("network access in offline mode")
+
+    index = pd.bdate_range("2020-01-01", periods=50).date
+    seeded = pd.DataFrame(
+        {col: 50.0 + np.arange(50.0) for col in ['SPY', 'XLK', 'XLV', 'XLE', 'XLF', 'XLI', 'XLY', 'VIX']},
+        index=index,
+    )
+    store = price_store.PriceStore(str(tmp_path / "prices.sqlite"))
+    store.import_frame(seeded)
+
+    data = model.download_data("2020-01-01", store=store, offline=True, provider=NoNetwork())
+
+    assert list(data.columns) == list(seeded.columns)
+    assert np.array_equal(data.values, seeded.values)
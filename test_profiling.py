@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import model
+import profiling
+import strategy_analysis_agent as agent
+
+
+@pytest.fixture(autouse=True)
+def clean_profiler(monkeypatch):
+    monkeypatch.setattr(profiling, 'ENABLED', False)
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', None)
+    monkeypatch.setattr(profiling, '_default', profiling.Collector())
+
+
+@profiling.timed('square')
+def square(x):
+    return x * x
+
+
+def test_disabled_profiler_records_nothing():
+    assert square(3) == 9
+    profiling.count('things')
+
+    report = profiling.report()
+    assert report['stages'] == {}
+    assert report['counters'] == {}
+
+
+def test_stages_and_counters_are_recorded():
+    profiling.enable()
+    for x in range(4):
+        square(x)
+    with profiling.stage('outer'):
+        square(5)
+    profiling.count('things', 2)
+    profiling.count('things')
+
+    report = profiling.report()
+    assert report['stages']['square']['calls'] == 5
+    assert report['stages']['outer']['calls'] == 1
+    assert report['stages']['outer']['total_seconds'] >= report['stages']['square']['min_seconds']
+    assert report['counters'] == {'things': 3}
+    assert list(profiling.report_frame().columns) == [
+        'calls', 'total_seconds', 'mean_seconds', 'min_seconds', 'max_seconds']
+
+
+def test_pipeline_functions_are_instrumented(price_panel):
+    profiling.enable()
+    model.rolling_backtest(price_panel, window_years=5)
+
+    stages = profiling.report()['stages']
+    assert stages['rolling_backtest']['calls'] == 1
+    assert stages['backtest']['calls'] == 2
+    assert stages['generate_signals']['calls'] == 2
+
+
+def test_outermost_stages_are_dumped_with_cprofile(tmp_path):
+    profiling.enable(str(tmp_path))
+    with profiling.stage('outer'):
+        square(2)
+    square(3)
+
+    assert sorted(os.listdir(tmp_path)) == ['0001-outer.prof', '0002-square.prof']
+
+
+def test_report_is_written_as_json(tmp_path, capsys):
+    profiling.enable()
+    square(2)
+    path = tmp_path / 'report.json'
+    profiling.emit_report(str(path))
+
+    assert json.loads(path.read_text())['stages']['square']['calls'] == 1
+    assert '[profile] stage=square calls=1' in capsys.readouterr().out
+
+
+def test_collectors_of_concurrent_runs_are_isolated():
+    reports = {}
+
+    def run(name, calls):
+        with profiling.collect() as collector:
+            for x in range(calls):
+                square(x)
+            profiling.count(name)
+        reports[name] = collector.report()
+
+    threads = [threading.Thread(target=run, args=(name, calls)) for name, calls in [('a', 2), ('b', 3)]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    square(1)
+
+    assert reports['a']['stages']['square']['calls'] == 2 and reports['a']['counters'] == {'a': 1}
+    assert reports['b']['stages']['square']['calls'] == 3 and reports['b']['counters'] == {'b': 1}
+    assert profiling.report()['stages'] == {}
+
+
+def test_only_the_main_thread_is_profiled(tmp_path):
+    with profiling.collect(str(tmp_path)) as collector:
+        worker = threading.Thread(target=square, args=(2,))
+        worker.start()
+        worker.join()
+        square(3)
+
+    # The new thread does not inherit the context, so only the main thread's call is recorded
+    assert collector.report()['stages']['square']['calls'] == 1
+    assert sorted(os.listdir(tmp_path)) == ['0001-square.prof']
+
+
+def test_llm_worker_threads_report_to_the_run_collector(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent, "_default_rate_limiter", agent.RateLimiter(0))
+    index = pd.bdate_range("2020-01-01", periods=40)
+    data = pd.DataFrame({"VIX": 20.0}, index=index)
+    metrics = {f"{side} {name}": 0.1 for side in ("Strategy", "SPY")
+               for name in ("Return", "Volatility", "Sharpe", "Max Drawdown")}
+    results = pd.DataFrame([{"Start Date": index[start], "End Date": index[start + 19],
+                             "Average Turnover": 0.05, **metrics} for start in (0, 20)])
+
+    with profiling.collect() as collector:
+        agent.analyze_all_windows(results, data, model=agent.StubModel(), cache=False, max_workers=2)
+
+    report = collector.report()
+    assert report['counters'] == {'llm_requests': 2}
+    assert report['stages']['llm_request']['calls'] == 2
+    assert profiling.report()['counters'] == {}
@@ -0,0 +1,139 @@
+import os
+
+import pandas as pd
+import pytest
+
+import model
+import optimize
+import result_cache
+import synthetic_data
+
+
+@pytest.fixture
+def data():
+    return synthetic_data.make_price_panel(7, 5, seed=5)
+
+
+@pytest.fixture
+def counted_backtest(monkeypatch):
+    calls = []
+    original = model.rolling_backtest
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs.get('config'))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(model, 'rolling_backtest', counting)
+    return calls
+
+
+def test_fingerprint_tracks_values_and_dates(data):
+    fingerprint = result_cache.data_fingerprint(data)
+
+    assert fingerprint == result_cache.data_fingerprint(data.copy())
+    changed = data.copy()
+    changed.iloc[10, 2] += 0.01
+    assert fingerprint != result_cache.data_fingerprint(changed)
+    assert fingerprint != result_cache.data_fingerprint(data.iloc[1:])
+
+
+def test_equivalent_points_are_computed_once(data, counted_backtest):
+    cache = result_cache.ResultCache(directory=None)
+    params = [0.12, 20.2, 15, 60, 120, 0.1, 0.15, 30.0, 45.0]
+    same_effective = [0.12, 20.4, 60, 15.3, 120, 0.1, 0.15, 30.0, 45.0]
+
+    first = optimize.objective(params, data, cache=cache)
+    second = optimize.objective(same_effective, data, cache=cache)
+
+    assert first == second
+    assert len(counted_backtest) == 1
+    assert cache.hits == 1
+
+
+def test_disk_cache_survives_restart(data, tmp_path, counted_backtest):
+    config = model.StrategyConfig(base_threshold=0.08)
+    directory = str(tmp_path / "cache")
+
+    expected = result_cache.cached_rolling_backtest(
+        data, config, cache=result_cache.ResultCache(directory))
+    restarted = result_cache.ResultCache(directory)
+    results = result_cache.cached_rolling_backtest(data, config, cache=restarted)
+
+    pd.testing.assert_frame_equal(results, expected)
+    assert len(counted_backtest) == 1
+    assert restarted.hits == 1
+
+
+def test_options_are_part_of_the_key(data, counted_backtest):
+    cache = result_cache.ResultCache(directory=None)
+    config = model.StrategyConfig()
+
+    result_cache.cached_rolling_backtest(data, config, cache=cache)
+    result_cache.cached_rolling_backtest(data, config, cache=cache, single_pass=True)
+    result_cache.cached_rolling_backtest(data, config, cache=cache, single_pass=True, workers=2)
+
+    assert len(counted_backtest) == 2
+
+
+def test_indicator_path_is_cached_separately(data, counted_backtest):
+    cache = result_cache.ResultCache(directory=None)
+    config = model.StrategyConfig()
+    indicators = model.IndicatorCache(data)
+
+    result_cache.cached_rolling_backtest(data, config, cache=cache)
+    result_cache.cached_rolling_backtest(data, config, cache=cache, indicators=indicators)
+    assert len(counted_backtest) == 2
+
+    # A single pass gives identical results with or without indicators
+    result_cache.cached_rolling_backtest(data, config, cache=cache, single_pass=True)
+    result_cache.cached_rolling_backtest(data, config, cache=cache, single_pass=True,
+                                         indicators=indicators)
+    assert len(counted_backtest) == 3
+    pd.testing.assert_frame_equal(model.rolling_backtest(data, single_pass=True),
+                                  model.rolling_backtest(data, single_pass=True, indicators=indicators),
+                                  check_exact=True)
+
+
+def test_engine_version_is_part_of_the_key(data, monkeypatch):
+    fingerprint = result_cache.data_fingerprint(data)
+    key = result_cache.result_key(model.StrategyConfig(), fingerprint)
+    monkeypatch.setattr(result_cache, 'CACHE_VERSION', result_cache.CACHE_VERSION + 1)
+
+    assert result_cache.result_key(model.StrategyConfig(), fingerprint) != key
+
+
+def test_non_scalar_options_are_rejected(data):
+    fingerprint = result_cache.data_fingerprint(data)
+    with pytest.raises(ValueError):
+        result_cache.result_key(model.StrategyConfig(), fingerprint, portfolio=data)
+
+
+def test_eviction_skips_files_removed_by_another_worker(tmp_path, monkeypatch):
+    cache = result_cache.ResultCache(str(tmp_path), max_disk_entries=1)
+    cache.put('a', pd.DataFrame({'x': [0]}))
+    scandir = os.scandir
+
+    def racing_scandir(path):
+        entries = list(scandir(path))
+        os.remove(tmp_path / 'a.pkl')  # evicted by another worker after the listing
+        return entries
+
+    monkeypatch.setattr(result_cache.os, 'scandir', racing_scandir)
+    cache.put('b', pd.DataFrame({'x': [1]}))
+
+    assert sorted(os.listdir(tmp_path)) == ['b.pkl']
+
+
+def test_lru_eviction(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path), max_memory_entries=2, max_disk_entries=2)
+    frames = {key: pd.DataFrame({'x': [i]}) for i, key in enumerate(['a', 'b', 'c'])}
+
+    cache.put('a', frames['a'])
+    cache.put('b', frames['b'])
+    os.utime(tmp_path / 'a.pkl', (1, 1))
+    os.utime(tmp_path / 'b.pkl', (2, 2))
+    cache.get('a')  # refreshes 'a' in memory and on disk
+    cache.put('c', frames['c'])
+
+    assert sorted(os.listdir(tmp_path)) == ['a.pkl', 'c.pkl']
+    assert list(cache._memory) == ['a', 'c']
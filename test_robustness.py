@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import metrics
+import model
+import robustness
+import synthetic_data
+
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic_data.make_price_panel(7, 4, seed=5)
+
+
+@pytest.fixture(scope='module')
+def config():
+    return model.StrategyConfig(window=60, min_history=60)
+
+
+def test_historical_path_matches_backtest(data, config):
+    prices = data.to_numpy(dtype=float)
+    columns = list(data.columns)
+    sources = np.tile(np.arange(len(data)), (2, 1))
+    paths = robustness.resample_prices(prices, sources, level_columns=[columns.index('VIX')])
+    np.testing.assert_allclose(paths[0], prices, rtol=1e-12)
+
+    for top_k in (1, 3):
+        top_k_config = config.replace(top_k=top_k, base_threshold=0.0)
+        values = robustness.simulate_paths(paths, columns, top_k_config)
+        portfolio, _ = model.backtest(data, model.generate_signals(data, config=top_k_config),
+                                      config=top_k_config)
+        np.testing.assert_allclose(values[1], portfolio['value'].to_numpy(), rtol=1e-9)
+
+
+def test_block_bootstrap_days(data):
+    n_days = len(data)
+    sources = robustness.resample_days(n_days, range(50), block_size=20)
+
+    assert sources.shape == (50, n_days)
+    assert (sources[:, 0] == 0).all()
+    assert sources[:, 1:].min() >= 1 and sources.max() < n_days
+    continued = np.diff(sources, axis=1) == 1
+    assert continued.mean() == pytest.approx(1 - 1 / 20, abs=0.01)
+    np.testing.assert_array_equal(robustness.resample_days(n_days, [7], block_size=20)[0], sources[7])
+
+
+def test_regime_blocks_follow_historical_transitions(data, config):
+    regimes = robustness.vix_regimes(data['VIX'], config)
+    assert len(np.unique(regimes)) > 1
+    sources = robustness.resample_days(len(data), range(20), block_size=10, regimes=regimes)
+
+    previous, current = sources[:, :-1], sources[:, 1:]
+    jumps = current != previous + 1
+    expected = regimes[np.minimum(previous + 1, len(data) - 1)]
+    np.testing.assert_array_equal(regimes[current][jumps], expected[jumps])
+
+
+def test_results_do_not_depend_on_chunking_or_workers(data, config):
+    results = robustness.run_robustness(data, 12, config=config, seed=3, chunk_size=12)
+    chunked = robustness.run_robustness(data, 12, config=config, seed=3, chunk_size=5, workers=2)
+
+    pd.testing.assert_frame_equal(results, chunked)
+    assert list(results.columns[:len(metrics.METRIC_NAMES)]) == list(metrics.METRIC_NAMES)
+    assert results['spy_annual_return'].nunique() > 1
+
+
+def test_chunk_size_fits_memory_budget(data, config):
+    path_bytes = robustness.PATH_ARRAYS * len(data) * 8 * 8
+    assert robustness.chunk_size_for(len(data), 8, memory_budget=100 * path_bytes) == 100
+    assert robustness.chunk_size_for(len(data), 8, workers=4, memory_budget=100 * path_bytes) == 25
+    assert robustness.chunk_size_for(len(data), 500, workers=4, memory_budget=path_bytes) == 1
+
+    small = robustness.run_robustness(data, 6, config=config, seed=2,
+                                      memory_budget=2 * path_bytes)
+    pd.testing.assert_frame_equal(small, robustness.run_robustness(data, 6, config=config, seed=2))
+
+
+def test_summary_and_validation(data, config):
+    results = robustness.run_robustness(data, 8, method='regime', config=config)
+    summary = robustness.summarize(results)
+
+    assert list(summary.columns) == ['mean', 'std', 'q0.05', 'q0.25', 'q0.5', 'q0.75', 'q0.95']
+    assert summary.loc['sharpe', 'mean'] == pytest.approx(results['sharpe'].mean())
+
+    with pytest.raises(ValueError):
+        robustness.run_robustness(data, 4, method='jackknife')
+    missing = data.copy()
+    missing.iloc[5, 1] = np.nan
+    with pytest.raises(ValueError):
+        robustness.run_robustness(missing, 4)
@@ -1,10 +1,16 @@
 import re
+import time
 
 import pandas as pd
+import pytest
 
 import strategy_analysis_agent as agent
 
 
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(agent, "_default_rate_limiter", agent.RateLimiter(0))
+
 def test_no_hardcoded_google_api_key():
     source = open("strategy_analysis_agent.py", encoding="utf-8").read()
 
@@ -33,3 +39,117 @@ def test_analysis_is_disabled_without_api_key(monkeypatch):
     result = agent.analyze_trading_window(window_data, vix_data)
 
     assert "AI strategy review is disabled" in result
+
+
+def make_results():
+    index = pd.bdate_range("2020-01-01", periods=60)
+    data = pd.DataFrame({"VIX": range(60)}, index=index, dtype=float)
+    windows = []
+    for start in range(0, 60, 20):
+        windows.append({
+            "Start Date": index[start],
+            "End Date": index[start + 19],
+            "SPY Return": 0.01 * start,
+            "SPY Volatility": 0.10,
+            "SPY Sharpe": 1.0,
+            "SPY Max Drawdown": 0.02,
+            "Strategy Return": 0.02,
+            "Strategy Volatility": 0.12,
+            "Strategy Sharpe": 1.2,
+            "Strategy Max Drawdown": 0.03,
+            "Average Turnover": 0.05,
+        })
+    return pd.DataFrame(windows), data
+
+
+def test_stub_model_analyzes_windows_in_order(tmp_path):
+    results, data = make_results()
+    stub = agent.StubModel()
+
+    analyses = agent.analyze_all_windows(results, data, model=stub, cache=agent.ResponseCache(str(tmp_path)),
+                                         max_workers=3, rate_limiter=agent.RateLimiter(0))
+
+    assert [a["period"] for a in analyses] == [
+        "2020-01-01 to 2020-01-28", "2020-01-29 to 2020-02-25", "2020-02-26 to 2020-03-24"]
+    assert "SPY Return: 20.00%" in analyses[1]["analysis"]
+    assert stub.calls == 3
+
+
+def test_unchanged_windows_are_served_from_cache(tmp_path):
+    results, data = make_results()
+    agent.analyze_all_windows(results, data, model=agent.StubModel(), cache=agent.ResponseCache(str(tmp_path)))
+
+    stub = agent.StubModel()
+    results.loc[2, "Strategy Return"] = 0.5
+    analyses = agent.analyze_all_windows(results, data, model=stub, cache=agent.ResponseCache(str(tmp_path)))
+
+    assert stub.calls == 1
+    assert "Strategy Return: 50.00%" in analyses[2]["analysis"]
+
+
+def test_errors_are_not_cached(tmp_path):
+    class FailingModel:
+        def generate_content(self, prompt):
+            raise RuntimeError("quota exceeded")
+
+    results, data = make_results()
+    cache = agent.ResponseCache(str(tmp_path))
+    analyses = agent.analyze_all_windows(results, data, model=FailingModel(), cache=cache)
+
+    assert all("quota exceeded" in a["analysis"] for a in analyses)
+    assert not list(tmp_path.glob("*.txt"))
+
+
+def test_shared_client_is_built_once(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(agent, "_shared_model", None)
+    built = []
+    monkeypatch.setattr(agent, "_build_model", lambda api_key: built.append(api_key) or agent.StubModel())
+
+    assert agent.get_model() is agent.get_model()
+    assert built == ["test-key"]
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = agent.RateLimiter(requests_per_minute=1200)
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.wait()
+
+    assert time.monotonic() - start >= 3 * 0.05 - 0.01
+
+
+def test_streamed_analyses_build_up_to_the_full_text(tmp_path):
+    results, data = make_results()
+    expected = agent.analyze_all_windows(results, data, model=agent.StubModel(),
+                                         cache=agent.ResponseCache(str(tmp_path / 'expected')))
+
+    events = list(agent.iter_window_analyses(results, data, model=agent.StubModel(),
+                                             cache=agent.ResponseCache(str(tmp_path / 'streamed'))))
+
+    final = {position: text for position, _, text, done in events if done}
+    assert [final[i] for i in range(3)] == [a["analysis"] for a in expected]
+    partial = [(position, text) for position, _, text, done in events if not done]
+    assert len(partial) > 3
+    assert all(final[position].startswith(text) for position, text in partial)
+
+
+def test_caching_can_be_turned_off(monkeypatch):
+    results, data = make_results()
+    monkeypatch.setattr(agent, "_get_default_cache", lambda: pytest.fail("default cache was used"))
+    stub = agent.StubModel()
+
+    agent.analyze_all_windows(results, data, model=stub, cache=False)
+    agent.analyze_all_windows(results, data, model=stub, cache=False)
+
+    assert stub.calls == 6
+
+
+def test_cached_windows_complete_without_streaming(tmp_path):
+    results, data = make_results()
+    cache = agent.ResponseCache(str(tmp_path))
+    list(agent.iter_window_analyses(results, data, model=agent.StubModel(), cache=cache))
+
+    events = list(agent.iter_window_analyses(results, data, model=agent.StubModel(), cache=cache))
+
+    assert [done for _, _, _, done in events] == [True, True, True]
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+import metrics
+import model
+import sweep
+import synthetic_data
+
+
+@pytest.fixture
+def data():
+    return synthetic_data.make_price_panel(7, 6, seed=11)
+
+
+GRID = dict(
+    base_thresholds=[0.0, 0.1, 0.3],
+    vix_high_thresholds=[20, 30],
+    vix_extreme_thresholds=[35, 45, 60],
+)
+
+
+def test_grid_covers_every_combination():
+    grid = sweep.parameter_grid(**GRID)
+
+    assert len(grid) == 18
+    assert not grid.duplicated().any()
+
+
+def test_sweep_matches_single_backtests(data):
+    results = sweep.sweep_parameters(data, **GRID)
+
+    for _, row in results.iloc[::4].iterrows():
+        config = model.StrategyConfig.from_globals().replace(
+            base_threshold=row['base_threshold'],
+            vix_high_threshold=row['vix_high_threshold'],
+            vix_extreme_threshold=row['vix_extreme_threshold'],
+        )
+        portfolio, _ = model.backtest(data, model.generate_signals(data, config=config), config=config)
+        expected = metrics.compute_metrics(portfolio['value'].to_numpy()[None, :])
+        for name in metrics.METRIC_NAMES:
+            assert row[name] == pytest.approx(expected[name][0], rel=1e-9, nan_ok=True)
+
+
+def test_window_sharpe_matches_single_pass_rolling_backtest(data):
+    results = sweep.sweep_parameters(data, **GRID, window_years=2)
+
+    row = results.iloc[7]
+    config = model.StrategyConfig.from_globals().replace(
+        base_threshold=row['base_threshold'],
+        vix_high_threshold=row['vix_high_threshold'],
+        vix_extreme_threshold=row['vix_extreme_threshold'],
+    )
+    rolling = model.rolling_backtest(data, window_years=2, single_pass=True, config=config)
+    assert row['avg_window_sharpe'] == pytest.approx(rolling['Strategy Sharpe'].mean(), rel=1e-9)
+
+
+def test_chunking_does_not_change_results(data):
+    whole = sweep.sweep_parameters(data, **GRID, window_years=2)
+    chunked = sweep.sweep_parameters(data, **GRID, window_years=2, chunk_size=5)
+
+    pd.testing.assert_frame_equal(whole, chunked)
+
+
+def test_top_k_sweep_matches_single_backtests(data):
+    base = model.StrategyConfig.from_globals().replace(top_k=3, weighting='signal')
+    results = sweep.sweep_parameters(data, **GRID, config=base)
+
+    for _, row in results.iloc[1::5].iterrows():
+        config = base.replace(
+            base_threshold=row['base_threshold'],
+            vix_high_threshold=row['vix_high_threshold'],
+            vix_extreme_threshold=row['vix_extreme_threshold'],
+        )
+        portfolio, _ = model.backtest(data, model.generate_signals(data, config=config), config=config)
+        expected = metrics.compute_metrics(portfolio['value'].to_numpy()[None, :])
+        for name in metrics.METRIC_NAMES:
+            assert row[name] == pytest.approx(expected[name][0], rel=1e-9, nan_ok=True)